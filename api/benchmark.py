@@ -0,0 +1,436 @@
+"""
+Query-count, latency and memory benchmark for every route in api/urls.py.
+
+`seed_dataset` fills the database with a realistic catalog, user base and
+order history, `run_benchmark` drives each scenario through the DRF test
+client, and `compare_with_baseline` reports anything that got worse than the
+stored baseline. The `benchmark_api` management command and api/tests.py are
+the two entry points.
+"""
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver, reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from order.models import Cart, CartItem, Order, OrderItem
+from payment.models import TransactionHistory
+from pet.cache import catalog_cache
+from pet.models import Category, Pet, PetImage, Review
+from users.models import AccountBalance, User
+
+BASELINE_PATH = Path(__file__).resolve().parent / "benchmark_baseline.json"
+
+DATASETS = {
+    "full": {"pets": 100_000, "users": 10_000, "order_items": 1_000_000},
+    "small": {"pets": 200, "users": 20, "order_items": 400},
+}
+
+PASSWORD = "benchmark-password"
+# Pets sent per request by the bulk endpoint scenarios.
+BULK_ITEMS = 50
+ITEMS_PER_ORDER = 5
+BATCH_SIZE = 5_000
+
+
+@dataclass
+class Scenario:
+    name: str
+    route: str
+    method: str = "get"
+    kwargs: dict = field(default_factory=dict)
+    query: str = ""
+    data: dict | list = None
+    user: str = "member"
+    # Writes run inside a transaction that is rolled back after every sample.
+    write: bool = False
+
+
+def seed_dataset(pets, users, order_items, batch_size=BATCH_SIZE):
+    """
+    Bulk-loads the dataset and returns the ids the scenarios point at.
+    Bulk inserts skip model signals, so account balances and the denormalized
+    pet columns are filled in directly.
+    """
+    password = make_password(PASSWORD)
+    categories = Category.objects.bulk_create(
+        Category(name=name, description=f"All kinds of {name.lower()}")
+        for name in ("Dog", "Cat", "Bird", "Rabbit", "Fish", "Reptile")
+    )
+
+    people = User.objects.bulk_create(
+        (
+            User(
+                email=f"user{index}@example.com",
+                first_name="User",
+                last_name=str(index),
+                phone_number="01234567890",
+                password=password,
+                is_active=True,
+            )
+            for index in range(users)
+        ),
+        batch_size=batch_size,
+    )
+    member, admin = people[0], people[1]
+    User.objects.filter(pk=admin.pk).update(is_staff=True)
+    AccountBalance.objects.bulk_create(
+        (
+            AccountBalance(user=person, balance=Decimal("1000000.00"), add_money=Decimal("1000000.00"))
+            for person in people
+        ),
+        batch_size=batch_size,
+    )
+
+    Pet.objects.bulk_create(
+        (
+            Pet(
+                name=f"Pet {index}",
+                age=Decimal(index % 15) + Decimal("0.5"),
+                description="A friendly companion looking for a home. " * 4,
+                breed=bool(index % 2),
+                price=Decimal(50 + index % 950),
+                category=categories[index % len(categories)],
+                # Most of the catalog has been adopted over time.
+                availability_status=index % 4 == 0,
+            )
+            for index in range(pets)
+        ),
+        batch_size=batch_size,
+    )
+    pet_ids = list(Pet.objects.order_by("id").values_list("id", flat=True))
+    available_ids = list(
+        Pet.objects.filter(availability_status=True).order_by("id").values_list("id", flat=True)
+    )
+    PetImage.objects.bulk_create(
+        (seeded_image(pet_id) for pet_id in pet_ids),
+        batch_size=batch_size,
+    )
+
+    order_count = max(order_items // ITEMS_PER_ORDER, 1)
+    orders = Order.objects.bulk_create(
+        (
+            Order(
+                user=people[index % len(people)],
+                status=Order.DELIVERED if index % 3 else Order.READY_TO_SHIP,
+                total_price=Decimal("500.00"),
+            )
+            for index in range(order_count)
+        ),
+        batch_size=batch_size,
+    )
+    OrderItem.objects.bulk_create(
+        (
+            OrderItem(
+                order=orders[index // ITEMS_PER_ORDER % len(orders)],
+                pet_id=pet_ids[index % len(pet_ids)],
+                price=Decimal("100.00"),
+                total_price=Decimal("100.00"),
+            )
+            for index in range(order_items)
+        ),
+        batch_size=batch_size,
+    )
+    TransactionHistory.objects.bulk_create(
+        (
+            TransactionHistory(
+                user=order.user,
+                order=order,
+                transaction_type=TransactionHistory.PAYMENT,
+                amount=order.total_price,
+                balance_after=Decimal("999500.00"),
+            )
+            for order in orders
+        ),
+        batch_size=batch_size,
+    )
+
+    # Each buyer reviews the first pet of each of their orders, once per pet.
+    reviewed = set()
+    reviews = []
+    for item in OrderItem.objects.filter(order__status=Order.DELIVERED).values(
+        "pet_id", "order__user_id"
+    ).order_by("id")[: max(pets // 2, 1)]:
+        key = (item["pet_id"], item["order__user_id"])
+        if key not in reviewed:
+            reviewed.add(key)
+            reviews.append(Review(pet_id=key[0], user_id=key[1], comments="Lovely pet."))
+    Review.objects.bulk_create(reviews, batch_size=batch_size)
+    per_pet = Review.objects.filter(pet=OuterRef("pk")).order_by().values("pet")
+    Pet.objects.filter(pk__in={review.pet_id for review in reviews}).update(
+        review_count=Subquery(per_pet.annotate(total=Count("id")).values("total")),
+        last_review_date=Subquery(per_pet.annotate(last=Max("date")).values("last")),
+    )
+
+    # The member has a cart ready for checkout and a pet it may still review.
+    cart = Cart.objects.create(user=member)
+    CartItem.objects.bulk_create(CartItem(cart=cart, pet_id=pet_id) for pet_id in available_ids[:3])
+    member_order = (
+        Order.objects.filter(user=member, status=Order.READY_TO_SHIP).order_by("created_at").first()
+        or Order.objects.create(user=member, total_price=Decimal("100.00"), status=Order.READY_TO_SHIP)
+    )
+    adopted = OrderItem.objects.create(
+        order=member_order, pet_id=available_ids[-1], price=Decimal("100.00"), total_price=Decimal("100.00")
+    )
+    member_items = OrderItem.objects.filter(order__user=member)
+
+    return {
+        "member": member.pk,
+        "admin": admin.pk,
+        "newcomer": people[-1].pk,
+        "category": categories[0].pk,
+        "pet": pet_ids[len(pet_ids) // 2],
+        "bulk_pets": pet_ids[:BULK_ITEMS],
+        "available_pet": available_ids[3] if len(available_ids) > 3 else available_ids[-1],
+        "image": PetImage.objects.filter(pet_id=pet_ids[len(pet_ids) // 2]).values_list("id", flat=True).first(),
+        "review_pet": reviews[0].pet_id,
+        "review": Review.objects.filter(pet_id=reviews[0].pet_id).values_list("id", flat=True).first(),
+        "unreviewed_pet": adopted.pet_id,
+        "cart": cart.pk,
+        "cart_item": cart.items.values_list("id", flat=True).first(),
+        "order": member_order.pk,
+        "order_item": member_items.values_list("id", flat=True).first(),
+        "transaction": TransactionHistory.objects.filter(user=member).values_list("id", flat=True).first(),
+        # Storefront listings only show available pets by default.
+        "last_page": max((len(available_ids) + 7) // 8, 1),
+    }
+
+
+def seeded_image(pet_id):
+    image = PetImage(pet_id=pet_id, image=f"pets/{pet_id}.jpg")
+    image.fill_urls()
+    return image
+
+
+def build_scenarios(ids):
+    pet = {"pk": ids["pet"]}
+    return [
+        Scenario("api-root", "api-root"),
+        Scenario("pets-list", "pets-list", user="anonymous"),
+        Scenario("pets-list:filtered", "pets-list", user="anonymous",
+                 query=f"category={ids['category']}&min_price=100&max_price=500&ordering=price"),
+        Scenario("pets-list:search", "pets-list", user="anonymous", query="search=Pet%201"),
+        Scenario("pets-list:last-page", "pets-list", user="anonymous", query=f"page={ids['last_page']}"),
+        Scenario("pets-list:cursor", "pets-list", user="anonymous", query="pagination=cursor"),
+        Scenario("pets-list:compact", "pets-list", user="anonymous", query="view=compact"),
+        Scenario("pets-list:sparse", "pets-list", user="anonymous", query="fields=id,name,price"),
+        Scenario("pets-detail", "pets-detail", kwargs=pet, user="anonymous"),
+        Scenario("pets-bulk", "pets-bulk", method="patch", user="admin", write=True,
+                 data=[{"id": pk, "price": "199.00", "availability_status": True} for pk in ids["bulk_pets"]]),
+        Scenario("pets-bulk:create", "pets-bulk", method="post", user="admin", write=True,
+                 data=[{"name": f"Bulk {index}", "category": ids["category"], "age": "1.0",
+                        "description": "Imported in bulk", "breed": False, "price": "99.00"}
+                       for index in range(BULK_ITEMS)]),
+        Scenario("allpets-list", "allpets-list", user="anonymous"),
+        Scenario("allpets-detail", "allpets-detail", kwargs=pet, user="anonymous"),
+        Scenario("category-list", "category-list", user="anonymous"),
+        Scenario("category-detail", "category-detail", kwargs={"pk": ids["category"]}, user="anonymous"),
+        Scenario("pet-review-list", "pet-review-list", kwargs={"pets_pk": ids["review_pet"]}),
+        Scenario("pet-review-detail", "pet-review-detail",
+                 kwargs={"pets_pk": ids["review_pet"], "pk": ids["review"]}),
+        Scenario("pet-review-list:create", "pet-review-list", method="post", write=True,
+                 kwargs={"pets_pk": ids["unreviewed_pet"]}, data={"comments": "Great companion."}),
+        Scenario("pet-images-list", "pet-images-list", kwargs={"pets_pk": ids["pet"]}),
+        Scenario("pet-images-detail", "pet-images-detail", kwargs={"pets_pk": ids["pet"], "pk": ids["image"]}),
+        Scenario("carts-list:create", "carts-list", method="post", write=True, user="newcomer", data={}),
+        Scenario("carts-detail", "carts-detail", kwargs={"pk": ids["cart"]}),
+        Scenario("cart-item-list", "cart-item-list", kwargs={"cart_pk": ids["cart"]}),
+        Scenario("cart-item-list:create", "cart-item-list", method="post", write=True,
+                 kwargs={"cart_pk": ids["cart"]}, data={"pet_id": ids["available_pet"]}),
+        Scenario("cart-item-detail", "cart-item-detail", kwargs={"cart_pk": ids["cart"], "pk": ids["cart_item"]}),
+        Scenario("cart-item-detail:delete", "cart-item-detail", method="delete", write=True,
+                 kwargs={"cart_pk": ids["cart"], "pk": ids["cart_item"]}),
+        Scenario("orders-list", "orders-list"),
+        Scenario("orders-list:cursor", "orders-list", query="pagination=cursor"),
+        Scenario("orders-list:create", "orders-list", method="post", write=True,
+                 data={"cart_id": str(ids["cart"])}),
+        Scenario("orders-detail", "orders-detail", kwargs={"pk": ids["order"]}),
+        Scenario("orders-cancel", "orders-cancel", method="post", write=True, kwargs={"pk": ids["order"]}),
+        Scenario("orders-mark-as-delivered", "orders-mark-as-delivered", method="post", write=True,
+                 user="admin", kwargs={"pk": ids["order"]}),
+        Scenario("orders-update-status", "orders-update-status", method="patch", write=True,
+                 user="admin", kwargs={"pk": ids["order"]}, data={"status": Order.SHIPPED}),
+        Scenario("order-item-list", "order-item-list", kwargs={"order_pk": ids["order"]}),
+        Scenario("order-item-detail", "order-item-detail",
+                 kwargs={"order_pk": ids["order"], "pk": ids["order_item"]}),
+        Scenario("payment_history-list", "payment_history-list"),
+        Scenario("payment_history-list:cursor", "payment_history-list", query="pagination=cursor"),
+        Scenario("payment_history-detail", "payment_history-detail", kwargs={"pk": ids["transaction"]}),
+        Scenario("payment_history-export", "payment_history-export"),
+        Scenario("payment_history-export:csv", "payment_history-export", query="export_format=csv&start=2000-01-01"),
+        Scenario("profile-list", "profile-list"),
+        Scenario("profile-detail", "profile-detail", kwargs={"pk": ids["member"]}),
+        Scenario("account_balance-list", "account_balance-list"),
+        Scenario("account_balance-list:deposit", "account_balance-list", method="post", write=True,
+                 data={"amount": "150.00", "pin": "1234"}),
+        Scenario("account_balance-detail", "account_balance-detail", kwargs={"pk": ids["member"]}),
+        Scenario("user-list", "user-list"),
+        Scenario("user-me", "user-me"),
+        Scenario("user-detail", "user-detail", kwargs={"id": ids["member"]}),
+        Scenario("user-activation", "user-activation", method="post", user="anonymous",
+                 data={"uid": "invalid", "token": "invalid"}),
+        Scenario("user-resend-activation", "user-resend-activation", method="post", write=True,
+                 user="anonymous", data={"email": "user0@example.com"}),
+        Scenario("user-reset-password", "user-reset-password", method="post", write=True,
+                 user="anonymous", data={"email": "user0@example.com"}),
+        Scenario("user-reset-password-confirm", "user-reset-password-confirm", method="post", user="anonymous",
+                 data={"uid": "invalid", "token": "invalid", "new_password": "x", "re_new_password": "x"}),
+        Scenario("user-reset-username", "user-reset-username", method="post", write=True,
+                 user="anonymous", data={"email": "user0@example.com"}),
+        Scenario("user-reset-username-confirm", "user-reset-username-confirm", method="post", user="anonymous",
+                 data={"uid": "invalid", "token": "invalid", "new_email": "new@example.com"}),
+        Scenario("user-set-password", "user-set-password", method="post", write=True,
+                 data={"current_password": "wrong", "new_password": "x", "re_new_password": "x"}),
+        Scenario("user-set-username", "user-set-username", method="post", write=True,
+                 data={"current_password": "wrong", "new_email": "new@example.com"}),
+        Scenario("jwt-create", "jwt-create", method="post", user="anonymous",
+                 data={"email": "user0@example.com", "password": PASSWORD}),
+        Scenario("jwt-refresh", "jwt-refresh", method="post", user="anonymous", data={"refresh": "member"}),
+        Scenario("jwt-verify", "jwt-verify", method="post", user="anonymous", data={"token": "member"}),
+    ]
+
+
+def api_route_names():
+    """Every named route registered under api/urls.py."""
+    from api import urls
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns)
+            elif pattern.name:
+                yield pattern.name
+
+    return set(walk(urls.urlpatterns))
+
+
+def run_benchmark(scenarios, ids, iterations=20):
+    """
+    Runs every scenario `iterations` times and returns per-scenario status,
+    query count, p50/p95 latency (ms) and peak traced memory (KiB).
+    The cache is cleared before each sample so numbers reflect the uncached path,
+    and request profiling is off so sampled requests do not skew timings.
+    """
+    users = {
+        name: User.objects.get(pk=ids[name]) for name in ("member", "admin", "newcomer")
+    }
+    tokens = RefreshToken.for_user(users["member"])
+    results = {}
+    # Expected 4xx/5xx answers would otherwise flood the output.
+    request_logger = logging.getLogger("django.request")
+    level, request_logger.level = request_logger.level, logging.CRITICAL
+    try:
+        with override_settings(PROFILING_SAMPLE_RATE=0.0):
+            for scenario in scenarios:
+                results[scenario.name] = measure(scenario, users, tokens, iterations)
+    finally:
+        request_logger.setLevel(level)
+    return results
+
+
+def consume(response):
+    """Drains streaming bodies so their queries and memory are measured too."""
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def measure(scenario, users, tokens, iterations):
+    client = APIClient(raise_request_exception=False)
+    if scenario.user != "anonymous":
+        client.force_authenticate(users[scenario.user])
+    data = scenario.data
+    if scenario.route == "jwt-refresh":
+        data = {"refresh": str(tokens)}
+    elif scenario.route == "jwt-verify":
+        data = {"token": str(tokens.access_token)}
+    url = reverse(scenario.route, kwargs=scenario.kwargs)
+    if scenario.query:
+        url = f"{url}?{scenario.query}"
+    send = getattr(client, scenario.method)
+
+    def request():
+        catalog_cache.clear()
+        if not scenario.write:
+            return consume(send(url, data, format="json") if data is not None else send(url))
+        with transaction.atomic():
+            response = consume(send(url, data, format="json"))
+            transaction.set_rollback(True)
+        return response
+
+    # Query count and peak memory come from one traced sample; latency from
+    # untraced ones, since tracemalloc slows everything down.
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        response = request()
+    # Read now: every later request resets the connection's query log.
+    query_count = len(queries)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        request()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "status": response.status_code,
+        "queries": query_count,
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance=1.5, check_timing=True):
+    """
+    Returns a list of human-readable regressions. Server errors always count,
+    status codes must match and query counts may not grow; latency and
+    memory may grow by `tolerance`.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        if result["status"] >= 500:
+            regressions.append(f"{name}: server error {result['status']}")
+        expected = baseline.get(name)
+        if expected is None:
+            regressions.append(f"{name}: no baseline recorded")
+            continue
+        if result["status"] != expected["status"]:
+            regressions.append(f"{name}: status {result['status']} != {expected['status']}")
+        if result["queries"] > expected["queries"]:
+            regressions.append(f"{name}: {result['queries']} queries > {expected['queries']}")
+        if not check_timing:
+            continue
+        for metric in ("p95_ms", "peak_kb"):
+            if result[metric] > expected[metric] * tolerance:
+                regressions.append(
+                    f"{name}: {metric} {result[metric]} > {expected[metric]} x {tolerance}"
+                )
+    return regressions
+
+
+def load_baseline(dataset, path=BASELINE_PATH):
+    if not Path(path).exists():
+        return {}
+    return json.loads(Path(path).read_text()).get(dataset, {})
+
+
+def save_baseline(dataset, results, path=BASELINE_PATH):
+    """Stores results per scenario, keeping scenarios that were not re-run."""
+    stored = json.loads(Path(path).read_text()) if Path(path).exists() else {}
+    stored.setdefault(dataset, {}).update(results)
+    Path(path).write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
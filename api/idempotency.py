@@ -0,0 +1,120 @@
+"""
+Idempotency-Key support for endpoints that move money. The first request
+with a key runs normally and its response is stored; retries with the same
+key get that response back instead of running the handler again.
+"""
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+from api.models import IdempotencyRecord
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def request_fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(f"{request.method} {request.path}\n{payload}".encode()).hexdigest()
+
+
+def idempotent(handler):
+    """
+    Makes a viewset handler honour the Idempotency-Key header.
+    - A stored response for the key is replayed with `Idempotent-Replayed: true`.
+    - The same key with a different payload is refused with 422, and one
+      whose first request is still running with 409. A request that died
+      midway holds its key for IDEMPOTENCY_IN_PROGRESS_TIMEOUT only.
+    - Returned responses below 500 are stored in the handler's transaction
+      and kept for IDEMPOTENCY_KEY_TTL. Server errors and unexpected
+      exceptions commit nothing. Raised client errors (validation errors
+      included) commit what they would have without a key, such as an empty
+      cart being removed. Either way the key is released and a retry runs
+      the handler again.
+    Requests without the header are handled as before.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > IdempotencyRecord._meta.get_field("key").max_length:
+            raise ValidationError({IDEMPOTENCY_HEADER: ["Ensure this value has at most 255 characters."]})
+
+        scope = f"{self.basename}.{self.action}"
+        fingerprint = request_fingerprint(request)
+        record = IdempotencyRecord.objects.filter(user=request.user, scope=scope, key=key).first()
+        if record is not None and record.expires_at <= timezone.now():
+            record.delete()
+            record = None
+        if record is None:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyRecord.objects.create(
+                        user=request.user,
+                        scope=scope,
+                        key=key,
+                        fingerprint=fingerprint,
+                        expires_at=timezone.now() + settings.IDEMPOTENCY_IN_PROGRESS_TIMEOUT,
+                    )
+            except IntegrityError:
+                # A concurrent request with the same key got there first.
+                return Response(
+                    {"detail": "A request with this Idempotency-Key is still in progress."}, status=409
+                )
+            return run_and_store(record, handler, self, request, *args, **kwargs)
+
+        if record.fingerprint != fingerprint:
+            return Response(
+                {"detail": "This Idempotency-Key was already used for a different request."}, status=422
+            )
+        if record.status_code is None:
+            return Response(
+                {"detail": "A request with this Idempotency-Key is still in progress."}, status=409
+            )
+        return Response(record.response, status=record.status_code, headers={REPLAYED_HEADER: "true"})
+
+    return wrapper
+
+
+def run_and_store(record, handler, view, request, *args, **kwargs):
+    """
+    Runs the handler and stores its response in one transaction, so the
+    response is kept exactly when the handler's writes are.
+    """
+    refused = None
+    try:
+        with transaction.atomic():
+            try:
+                response = handler(view, request, *args, **kwargs)
+            except APIException as exc:
+                if exc.status_code >= 500:
+                    raise
+                # Leave the block normally, so the refusal commits the same
+                # writes as it does for requests without a key.
+                refused = exc
+            else:
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                else:
+                    IdempotencyRecord.objects.filter(pk=record.pk).update(
+                        status_code=response.status_code,
+                        response=response.data,
+                        expires_at=timezone.now() + settings.IDEMPOTENCY_KEY_TTL,
+                    )
+    except Exception:
+        record.delete()
+        raise
+    if refused is not None:
+        record.delete()
+        raise refused
+    if response.status_code >= 500:
+        record.delete()
+    return response
@@ -0,0 +1,77 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from api.benchmark import (
+    DATASETS,
+    api_route_names,
+    build_scenarios,
+    compare_with_baseline,
+    load_baseline,
+    run_benchmark,
+    save_baseline,
+    seed_dataset,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway test database, drives every API route through the "
+        "DRF test client and compares query counts, p50/p95 latency and peak "
+        "memory against the stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        # Only "small" has a committed baseline; record one for "full" on the
+        # machine it is compared on with --update-baseline.
+        parser.add_argument("--dataset", choices=sorted(DATASETS), default="small")
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--tolerance", type=float, default=1.5,
+                            help="Allowed growth factor for latency and memory.")
+        parser.add_argument("--only", help="Run only scenarios whose name starts with this.")
+        parser.add_argument("--output", help="Also write the results to this JSON file.")
+        parser.add_argument("--update-baseline", action="store_true",
+                            help="Store these results as the new baseline instead of comparing.")
+
+    def handle(self, *args, **options):
+        dataset = options["dataset"]
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            started = time.perf_counter()
+            ids = seed_dataset(**DATASETS[dataset])
+            self.stdout.write(f"Seeded '{dataset}' dataset in {time.perf_counter() - started:.1f}s")
+
+            scenarios = build_scenarios(ids)
+            missing = api_route_names() - {scenario.route for scenario in scenarios}
+            if missing:
+                raise CommandError(f"Routes without a benchmark scenario: {', '.join(sorted(missing))}")
+            if options["only"]:
+                scenarios = [s for s in scenarios if s.name.startswith(options["only"])]
+            results = run_benchmark(scenarios, ids, iterations=options["iterations"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, result in sorted(results.items()):
+            self.stdout.write(
+                f"{name:36} {result['status']:>3} {result['queries']:>4}q "
+                f"p50 {result['p50_ms']:>9.2f}ms p95 {result['p95_ms']:>9.2f}ms "
+                f"peak {result['peak_kb']:>10.1f}KiB"
+            )
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                json.dump(results, handle, indent=2, sort_keys=True)
+
+        if options["update_baseline"]:
+            errors = sorted(name for name, result in results.items() if result["status"] >= 500)
+            if errors:
+                raise CommandError(f"Not recording server errors as the baseline: {', '.join(errors)}")
+            save_baseline(dataset, results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline for '{dataset}' updated."))
+            return
+        regressions = compare_with_baseline(results, load_baseline(dataset), options["tolerance"])
+        if regressions:
+            raise CommandError("Benchmark regressions:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
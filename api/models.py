@@ -1,3 +1,44 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class IdempotencyRecordQuerySet(models.QuerySet):
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class IdempotencyRecord(models.Model):
+    """
+    The response to a request made with an Idempotency-Key, replayed to
+    retries of that request until `expires_at`. A record without a status
+    code belongs to a request that is still running.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+", db_index=False
+    )
+    # The endpoint the key was used on, e.g. "orders.create".
+    scope = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    # SHA-256 of the request payload, so a reused key with a different
+    # payload is refused instead of answered with someone else's response.
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    expires_at = models.DateTimeField()
+
+    objects = IdempotencyRecordQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Also the index behind the single lookup of a retry.
+            models.UniqueConstraint(fields=["user", "scope", "key"], name="idempotency_user_scope_key_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["expires_at"], name="idempotency_expires_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
@@ -0,0 +1,27 @@
+"""Line-at-a-time CSV/JSONL rendering for exports that must not buffer."""
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+FORMATS = ("csv", "jsonl")
+CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+def render_rows(rows, fmt, fieldnames):
+    """Turns row dicts into text chunks, one line at a time, header first for CSV."""
+    if fmt == "jsonl":
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+        return
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,9 @@
+from celery import shared_task
+from api.models import IdempotencyRecord
+
+
+@shared_task
+def purge_idempotency_records(batch_size=1000):
+    """Deletes expired Idempotency-Key records, one bounded batch per run."""
+    ids = list(IdempotencyRecord.objects.expired().values_list("pk", flat=True)[:batch_size])
+    return IdempotencyRecord.objects.filter(pk__in=ids).delete()[0]
@@ -0,0 +1,19 @@
+"""Helpers shared by the apps' test suites."""
+import time
+
+from django.db import OperationalError
+
+# A stuck lock fails the test instead of hanging it.
+LOCK_ATTEMPTS = 200
+
+
+def retry_on_lock(operation, *args):
+    """SQLite reports writer contention as an error instead of waiting."""
+    for _ in range(LOCK_ATTEMPTS):
+        try:
+            return operation(*args)
+        except OperationalError as exc:
+            if "locked" not in str(exc):
+                raise
+        time.sleep(0.005)
+    raise AssertionError(f"Database still locked after {LOCK_ATTEMPTS} attempts.")
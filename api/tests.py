@@ -1,3 +1,219 @@
-from django.test import TestCase
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from api.benchmark import (
+    DATASETS,
+    api_route_names,
+    build_scenarios,
+    compare_with_baseline,
+    load_baseline,
+    run_benchmark,
+    seed_dataset,
+)
+from api.models import IdempotencyRecord
+from api.tasks import purge_idempotency_records
+from order.models import Cart, CartItem, Order, OrderItem
+from payment.models import TransactionHistory
+from pet.models import Category, Pet
+from users.models import AccountBalance, User
 
-# Create your tests here.
+
+class EndpointBenchmarkTests(TransactionTestCase):
+    """
+    Runs the benchmark suite on the small dataset and fails when an endpoint
+    answers differently or needs more queries than the stored baseline.
+    Latency and memory are only compared by `manage.py benchmark_api`, on a
+    machine whose baseline they were recorded on.
+    """
+
+    def test_every_route_has_a_scenario(self):
+        scenarios = build_scenarios(seed_dataset(**DATASETS["small"]))
+        missing = api_route_names() - {scenario.route for scenario in scenarios}
+        self.assertEqual(missing, set())
+
+    def test_no_query_count_regressions(self):
+        ids = seed_dataset(**DATASETS["small"])
+        results = run_benchmark(build_scenarios(ids), ids, iterations=1)
+        regressions = compare_with_baseline(results, load_baseline("small"), check_timing=False)
+        self.assertEqual(regressions, [])
+
+
+class HotQueryIndexTests(TestCase):
+    """
+    EXPLAINs the hot catalog, order and ledger queries on the seeded dataset
+    and checks each one is answered from the index designed for it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ids = seed_dataset(**DATASETS["small"])
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            # A small table is cheaper to scan; ask whether the index is usable.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+
+    def test_pet_catalog_queries(self):
+        category, prices = self.ids["category"], {"price__gte": 100, "price__lte": 500}
+        self.assertUsesIndex(
+            Pet.objects.filter(category=category, **prices).order_by("price"),
+            "pet_category_price_idx",
+        )
+        available = Pet.objects.filter(availability_status=True)
+        self.assertUsesIndex(
+            available.filter(category=category, **prices).order_by("price"),
+            "pet_avail_category_price_idx",
+        )
+        self.assertUsesIndex(available.order_by("price", "id"), "pet_avail_price_idx")
+        self.assertUsesIndex(available.order_by("id"), "pet_avail_id_idx")
+
+    def test_order_and_ledger_queries(self):
+        user = self.ids["member"]
+        self.assertUsesIndex(
+            TransactionHistory.objects.filter(user=user).order_by("-created_at", "id"),
+            "txn_user_created_idx",
+        )
+        self.assertUsesIndex(
+            Order.objects.filter(user=user, status=Order.DELIVERED), "order_user_status_idx"
+        )
+        self.assertUsesIndex(
+            Order.objects.filter(user=user).order_by("-created_at", "id"), "order_user_created_idx"
+        )
+        self.assertUsesIndex(
+            OrderItem.objects.filter(pet_id=self.ids["review_pet"], order__user=user),
+            "orderitem_pet_order_idx",
+        )
+
+
+class RequestProfilingMiddlewareTests(TestCase):
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_SERVER_TIMING=True)
+    def test_sampled_request_is_profiled(self):
+        with self.assertLogs("peady.profiling", level="INFO") as logs:
+            response = self.client.get(reverse("pets-list"))
+
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        for metric in ("db;dur=", "serializer;dur=", "total;dur="):
+            self.assertIn(metric, timing)
+        profile = logs.records[0].profile
+        self.assertEqual(profile["view"], "pets-list")
+        self.assertEqual(profile["action"], "list")
+        self.assertGreater(profile["queries"], 0)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0.0)
+    def test_unsampled_request_is_left_alone(self):
+        response = self.client.get(reverse("pets-list"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("Server-Timing"))
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="holder@example.com", password="secret", phone_number="01234567890"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def deposit(self, amount="150.00", key=None):
+        headers = {"Idempotency-Key": key} if key else {}
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse("account_balance-list"), {"amount": amount, "pin": "1234"}, headers=headers
+            )
+
+    def test_retried_deposit_is_replayed(self):
+        first = self.deposit(key="deposit-1")
+        with self.assertNumQueries(1):
+            retry = self.deposit(key="deposit-1")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual((retry.status_code, retry.json()), (200, first.json()))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(AccountBalance.objects.get(user=self.user).balance, Decimal("150.00"))
+        self.assertEqual(TransactionHistory.objects.filter(user=self.user).count(), 1)
+
+    def test_key_reused_for_another_payload_is_refused(self):
+        self.deposit(key="deposit-1")
+        response = self.deposit(amount="200.00", key="deposit-1")
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(AccountBalance.objects.get(user=self.user).balance, Decimal("150.00"))
+
+    def test_requests_without_a_key_or_after_expiry_run_again(self):
+        self.deposit()
+        self.deposit()
+        self.deposit(key="deposit-1")
+        IdempotencyRecord.objects.update(expires_at=timezone.now())
+        response = self.deposit(key="deposit-1")
+
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+        self.assertEqual(AccountBalance.objects.get(user=self.user).balance, Decimal("600.00"))
+        self.assertEqual(purge_idempotency_records(), 0)
+        IdempotencyRecord.objects.update(expires_at=timezone.now())
+        self.assertEqual(purge_idempotency_records(), 1)
+
+    def test_key_of_a_request_that_died_midway_frees_up_quickly(self):
+        self.deposit(key="deposit-1")
+        # What a request that died before storing its response leaves behind.
+        IdempotencyRecord.objects.update(
+            status_code=None, response=None,
+            expires_at=timezone.now() + settings.IDEMPOTENCY_IN_PROGRESS_TIMEOUT,
+        )
+        self.assertEqual(self.deposit(key="deposit-1").status_code, 409)
+
+        IdempotencyRecord.objects.update(expires_at=timezone.now())
+        response = self.deposit(key="deposit-1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(
+            IdempotencyRecord.objects.get().expires_at,
+            timezone.now() + settings.IDEMPOTENCY_IN_PROGRESS_TIMEOUT,
+        )
+
+    def test_validation_errors_release_the_key(self):
+        self.assertEqual(self.deposit(amount="5.00", key="deposit-1").status_code, 400)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+    def test_empty_cart_checkout_with_a_key_still_removes_the_cart(self):
+        cart = Cart.objects.create(user=self.user)
+
+        response = self.client.post(
+            reverse("orders-list"), {"cart_id": str(cart.pk)}, headers={"Idempotency-Key": "order-1"}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Cart has been removed", str(response.data))
+        self.assertFalse(Cart.objects.filter(pk=cart.pk).exists())
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+    def test_retried_checkout_places_one_order(self):
+        AccountBalance.objects.filter(user=self.user).update(balance=Decimal("500.00"))
+        pet = Pet.objects.create(
+            name="Rex", age=1, description="Friendly", price=Decimal("100.00"),
+            category=Category.objects.create(name="Dog"),
+        )
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, pet=pet)
+
+        responses = [
+            self.client.post(
+                reverse("orders-list"), {"cart_id": str(cart.pk)}, headers={"Idempotency-Key": "order-1"}
+            )
+            for _ in range(2)
+        ]
+
+        self.assertEqual([response.status_code for response in responses], [201, 201])
+        self.assertEqual(responses[1].json(), responses[0].json())
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(AccountBalance.objects.get(user=self.user).balance, Decimal("400.00"))
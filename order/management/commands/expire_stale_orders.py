@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from order.services import StaleOrderSweeper
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancels and refunds pending orders older than PENDING_ORDER_TTL and "
+        "deletes carts idle for longer than ABANDONED_CART_TTL, in bounded "
+        "batches. The same sweep runs periodically as a Celery beat task."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--order-ttl-hours", type=int, help="Override PENDING_ORDER_TTL.")
+        parser.add_argument("--cart-ttl-days", type=int, help="Override ABANDONED_CART_TTL.")
+        parser.add_argument("--batch-size", type=int, help="Override STALE_SWEEP_BATCH_SIZE.")
+        parser.add_argument("--max-batches", type=int, help="Override STALE_SWEEP_MAX_BATCHES.")
+
+    def handle(self, *args, **options):
+        order_ttl = cart_ttl = None
+        if options["order_ttl_hours"] is not None:
+            order_ttl = timedelta(hours=options["order_ttl_hours"])
+        if options["cart_ttl_days"] is not None:
+            cart_ttl = timedelta(days=options["cart_ttl_days"])
+        sweeper = StaleOrderSweeper(options["batch_size"], options["max_batches"])
+        swept = sweeper.run(order_ttl=order_ttl, cart_ttl=cart_ttl)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Expired {swept['orders']} pending orders and reaped {swept['carts']} abandoned carts."
+            )
+        )
@@ -10,6 +10,13 @@ class Cart(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     user = models.OneToOneField( settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="cart")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Last activity; carts idle for longer than ABANDONED_CART_TTL are reaped.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at"], name="cart_updated_idx"),
+        ]
 
     def __str__(self):
         return f"Cart of {self.user.get_full_name() }"
@@ -28,9 +35,6 @@ class CartItem(models.Model):
 
 class Order(models.Model):
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._prev_status = self.status
     def is_empty(self):
         return not self.items.exists()
     PENDING = "Pending"
@@ -45,23 +49,42 @@ class Order(models.Model):
         (DELIVERED, "Delivered"),
         (CANCELED, "Canceled"),
     ]
+    # Statuses under which an order holds its pets.
+    ACTIVE_STATUSES = [PENDING, READY_TO_SHIP, SHIPPED, DELIVERED]
 
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="orders")
+    # Indexed through the composite user indexes below.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="orders", db_index=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "status"], name="order_user_status_idx"),
+            # Order history pages by newest first (CreatedAtCursorPagination).
+            models.Index(fields=["user", "-created_at", "id"], name="order_user_created_idx"),
+            # Oldest pending orders first, for the stale order sweep.
+            models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+        ]
+
     def __str__(self):
         return f"Order {self.id} by {self.user.get_full_name()} - {self.status}"
 
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
-    pet = models.ForeignKey(Pet, on_delete=models.CASCADE)
+    # Indexed through orderitem_pet_order_idx.
+    pet = models.ForeignKey(Pet, on_delete=models.CASCADE, db_index=False)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     total_price = models.DecimalField(max_digits=12, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # "Has this user adopted this pet?" check behind reviews.
+            models.Index(fields=["pet", "order"], name="orderitem_pet_order_idx"),
+        ]
+
     def __str__(self):
         return f"{self.pet.name} (Order {self.order.id})"
@@ -20,7 +20,7 @@ class SimplePetSerializer(serializers.ModelSerializer):
         # Return a list of all image URLs for this pet
         image_objs = getattr(obj, 'images', None)
         if image_objs and hasattr(image_objs, 'all'):
-            return [img.image.url for img in image_objs.all() if hasattr(img, 'image') and img.image]
+            return [img.url for img in image_objs.all() if img.url]
         return []
 
 
@@ -78,6 +78,9 @@ class CartItemSerializer(serializers.ModelSerializer):
 class CartSerializer(serializers.ModelSerializer):
 
     def get_total_price(self, cart):
+        # CartViewSet annotates the total; other callers sum the loaded items.
+        if hasattr(cart, 'total_price'):
+            return cart.total_price
         return sum(item.pet.price for item in cart.items.all())
     items = CartItemSerializer(many=True, read_only=True)
     total_price = serializers.SerializerMethodField(
@@ -109,32 +112,11 @@ class CartCreateSerializer(serializers.ModelSerializer):
 
 
 class CreateOrderSerializer(serializers.Serializer):
+    # Cart existence, emptiness and pet availability are checked by
+    # OrderService.create_order, whose conditional claim UPDATE also settles
+    # races with concurrent checkouts, not here.
     cart_id = serializers.UUIDField()
 
-    def validate_cart_id(self, cart_id):
-        if not Cart.objects.filter(pk=cart_id).exists():
-            raise serializers.ValidationError('No cart found with this id')
-
-        if not CartItem.objects.filter(cart_id=cart_id).exists():
-            raise serializers.ValidationError('Cart is empty')
-
-        # Check if all pets in the cart are still available
-        cart_items = CartItem.objects.filter(cart_id=cart_id).select_related('pet')
-        unavailable_pets = []
-        
-        for item in cart_items:
-            if not item.pet.availability_status:
-                unavailable_pets.append(item.pet.name)
-        
-        if unavailable_pets:
-            pets_list = ", ".join(unavailable_pets)
-            raise serializers.ValidationError(
-                f"The following pets are no longer available: {pets_list}. "
-                "Please remove them from your cart before placing the order."
-            )
-
-        return cart_id
-
     def create(self, validated_data):
         user = self.context['user']
         cart_id = validated_data['cart_id']
@@ -1,7 +1,12 @@
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from .models import Cart, Order, OrderItem
-from users.models import AccountBalance # Assuming this model exists
+from pet.models import Pet
+from payment.models import TransactionHistory
+from payment.services import LedgerService
 
 class OrderService:
     @staticmethod
@@ -9,53 +14,64 @@ class OrderService:
         if order.is_empty():
             order.delete()
     @staticmethod
-    @transaction.atomic
     def create_order(user, cart_id):
         """
-        Creates an order from a user's cart.
-        The initial status is set to 'Ready To Ship'. The post_save signal will
-        automatically handle marking the pets as unavailable.
+        Creates an order from a user's cart with a fixed query budget, however
+        many pets the cart holds:
+        - read the cart's pets and claim them all with one conditional
+          UPDATE, failing fast if any was taken by a concurrent checkout,
+        - insert the order and its items,
+        - debit the balance through the ledger (conditional UPDATE,
+          read-back and the payment record),
+        - drop the cart.
+        Any failure rolls the claim back with the rest of the transaction.
+        An empty cart is removed before the error is raised, outside the
+        transaction so the error does not roll the removal back.
+        The initial status is set to 'Ready To Ship'.
         """
-        try:
-            cart = Cart.objects.select_related('user').get(pk=cart_id, user=user)
-        except Cart.DoesNotExist:
-            raise ValidationError("Invalid cart or permission denied.")
-
-        cart_items = cart.items.select_related('pet').all()
-        if not cart_items.exists():
-            cart.delete()
-            raise ValidationError("Cannot create an order from an empty cart. Cart has been removed.")
+        pets = list(
+            Pet.objects.filter(cartitem__cart_id=cart_id, cartitem__cart__user=user)
+            .only("id", "name", "price", "availability_status")
+        )
+        if not pets:
+            if not Cart.objects.filter(pk=cart_id, user=user).delete()[0]:
+                raise ValidationError({"cart_id": ["No cart found with this id"]})
+            raise ValidationError({"cart_id": [
+                "Cannot create an order from an empty cart. Cart has been removed."
+            ]})
+        return OrderService._place_order(user, cart_id, pets)
 
+    @staticmethod
+    @transaction.atomic
+    def _place_order(user, cart_id, pets):
         # Check if any pets in the cart are already unavailable
-        unavailable_pets = [item.pet.name for item in cart_items if not item.pet.availability_status]
+        unavailable_pets = [pet.name for pet in pets if not pet.availability_status]
         if unavailable_pets:
-            raise ValidationError(f"The following pets are no longer available: {', '.join(unavailable_pets)}.")
-
-        total_price = sum(item.pet.price for item in cart_items)
-
-        # Handle payment/balance deduction
-        # (Assuming a simple AccountBalance model on the user)
-        try:
-            account = AccountBalance.objects.get(user=user)
-            if account.balance < total_price:
-                raise ValidationError("Insufficient balance.")
-            account.balance -= total_price
-            account.save()
-        except AccountBalance.DoesNotExist:
-            raise ValidationError("User account balance not found.")
-
-        # Create the order. The signal will handle pet availability.
+            raise ValidationError({"cart_id": [
+                f"The following pets are no longer available: {', '.join(unavailable_pets)}. "
+                "Please remove them from your cart before placing the order."
+            ]})
+
+        if Pet.objects.filter(pk__in=[pet.pk for pet in pets]).claim() != len(pets):
+            # A concurrent checkout took some pet since the read above;
+            # raising rolls back the claims that did succeed.
+            raise ValidationError({"cart_id": [
+                "Some pets in this cart were just reserved by another order. "
+                "Please review your cart and try again."
+            ]})
+
+        total_price = sum(pet.price for pet in pets)
+
         order = Order.objects.create(user=user, total_price=total_price, status=Order.READY_TO_SHIP)
-        # Create the corresponding order items
-        order_items_to_create = []
-        for item in cart_items:
-            order_item = OrderItem(order=order, pet=item.pet, price=item.pet.price, total_price=item.pet.price)
-            order_items_to_create.append(order_item)
-            # Mark pet as unavailable
-            item.pet.mark_unavailable()
-        OrderItem.objects.bulk_create(order_items_to_create)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, pet=pet, price=pet.price, total_price=pet.price)
+            for pet in pets
+        ])
+        # Raises on insufficient balance, rolling the order back with it.
+        LedgerService.charge(user, total_price, order=order)
         # The cart has been processed and can be deleted
-        cart.delete()
+        Cart.objects.filter(pk=cart_id).delete()
+        return order
 
     @staticmethod
     def remove_cart_if_empty(cart):
@@ -87,27 +103,101 @@ class OrderService:
         order.save()
 
         # Refund immediately to both balance and add_money
-        account, _ = AccountBalance.objects.get_or_create(user=order.user)
-        account.balance += order.total_price
-        account.add_money += order.total_price
-        account.save()
+        LedgerService.refund(order.user, order.total_price, order=order)
 
         return order
 
     @staticmethod
     def mark_pets_unavailable(order):
         """
-        Marks all pets in the order as unavailable.
+        Marks all pets in the order as unavailable in one UPDATE.
         """
-        for item in order.items.select_related('pet').all():
-            item.pet.availability_status = False
-            item.pet.save(update_fields=['availability_status'])
+        return Pet.objects.filter(orderitem__order=order).set_availability(False)
 
     @staticmethod
     def mark_pets_available(order):
         """
-        Marks all pets in the order as available.
+        Marks all pets in the order as available in one UPDATE.
         """
-        for item in order.items.select_related('pet').all():
-            item.pet.availability_status = True
-            item.pet.save(update_fields=['availability_status'])
\ No newline at end of file
+        return Pet.objects.filter(orderitem__order=order).set_availability(True)
+
+
+class StaleOrderSweeper:
+    """
+    Expires pending orders and reaps carts that outlived their TTL.
+    Work is done in batches of `batch_size`, each in its own transaction,
+    and at most `max_batches` per kind, so one run has a bounded cost and
+    a backlog is worked off over successive runs.
+    """
+
+    def __init__(self, batch_size=None, max_batches=None):
+        self.batch_size = batch_size or settings.STALE_SWEEP_BATCH_SIZE
+        self.max_batches = max_batches or settings.STALE_SWEEP_MAX_BATCHES
+
+    def run(self, order_ttl=None, cart_ttl=None):
+        order_ttl = settings.PENDING_ORDER_TTL if order_ttl is None else order_ttl
+        cart_ttl = settings.ABANDONED_CART_TTL if cart_ttl is None else cart_ttl
+        now = timezone.now()
+        return {
+            "orders": self.expire_pending_orders(now - order_ttl),
+            "carts": self.reap_abandoned_carts(now - cart_ttl),
+        }
+
+    def expire_pending_orders(self, cutoff):
+        """Cancels and refunds pending orders created before `cutoff`."""
+        expired = 0
+        for _ in range(self.max_batches):
+            count = self._expire_order_batch(cutoff)
+            expired += count
+            if count < self.batch_size:
+                break
+        return expired
+
+    @transaction.atomic
+    def _expire_order_batch(self, cutoff):
+        # Rows another sweep (or a cancel) holds are left for the next run.
+        orders = list(
+            Order.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("user")
+            .filter(status=Order.PENDING, created_at__lt=cutoff)
+            .order_by("created_at")[: self.batch_size]
+        )
+        if not orders:
+            return 0
+        ids = [order.pk for order in orders]
+        # A queryset update skips the per-order post_save signal; the pets
+        # of the whole batch are released in one UPDATE instead, except those
+        # another live order has claimed since.
+        Order.objects.filter(pk__in=ids).update(status=Order.CANCELED, updated_at=timezone.now())
+        held = OrderItem.objects.filter(pet=OuterRef("pk"), order__status__in=Order.ACTIVE_STATUSES)
+        Pet.objects.filter(orderitem__order__in=ids).exclude(Exists(held)).set_availability(True)
+        # Only orders that were paid for, and not refunded yet, get money back.
+        entries = set(
+            TransactionHistory.objects.filter(
+                order__in=ids,
+                transaction_type__in=[TransactionHistory.PAYMENT, TransactionHistory.REFUND],
+            ).values_list("order_id", "transaction_type")
+        )
+        for order in orders:
+            paid = (order.pk, TransactionHistory.PAYMENT) in entries
+            refunded = (order.pk, TransactionHistory.REFUND) in entries
+            if paid and not refunded:
+                LedgerService.refund(order.user, order.total_price, order=order)
+        return len(orders)
+
+    def reap_abandoned_carts(self, cutoff):
+        """Deletes carts, with their items, idle since before `cutoff`."""
+        reaped = 0
+        for _ in range(self.max_batches):
+            ids = list(
+                Cart.objects.filter(updated_at__lt=cutoff)
+                .order_by("updated_at")
+                .values_list("pk", flat=True)[: self.batch_size]
+            )
+            if ids:
+                # Re-check the cutoff: a cart used since it was selected stays.
+                _, deleted = Cart.objects.filter(pk__in=ids, updated_at__lt=cutoff).delete()
+                reaped += deleted.get(Cart._meta.label, 0)
+            if len(ids) < self.batch_size:
+                break
+        return reaped
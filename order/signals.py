@@ -1,46 +1,57 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
 from .models import Order, OrderItem
 from order.models import Cart, CartItem
+from pet.models import Pet
 
 @receiver(post_save, sender=Order)
-def multipurpose_order_status_signal(sender, instance, **kwargs):
+def multipurpose_order_status_signal(sender, instance, created=False, **kwargs):
     """
     Multipurpose signal: always triggers on Order save and updates pet availability for all status transitions.
     - If status is 'Canceled', associated pets are made available.
     - If status is 'Delivered', pets remain unavailable (adopted).
     - For 'Pending', 'Ready To Ship', 'Shipped', pets are made unavailable.
+    Each transition is a single set-based UPDATE over the order's pets.
+    A freshly created order has no items yet, so there is nothing to update.
     """
+    if created:
+        return
+    pets = Pet.objects.filter(orderitem__order=instance)
     if instance.status in[ Order.PENDING, Order.CANCELED]:
-        for item in instance.items.select_related('pet').all():
-            item.pet.mark_available()
+        pets.set_availability(True)
     elif instance.status in [ Order.READY_TO_SHIP, Order.SHIPPED,Order.DELIVERED]:
-        for item in instance.items.select_related('pet').all():
-            item.pet.mark_unavailable()
+        pets.set_availability(False)
     # For DELIVERED, do nothing (pets remain unavailable/adopted)
 
-@receiver(post_delete, sender=Order)
+@receiver(pre_delete, sender=Order)
 def multipurpose_order_delete_signal(sender, instance, **kwargs):
     """
     Signal to make pets available again when an order is deleted.
     This ensures that if an admin deletes an order, the pet isn't stuck
-    in an 'unavailable' state.
+    in an 'unavailable' state. It runs before the delete because the
+    order items are cascaded away before post_delete fires.
     """
-    for item in instance.items.select_related('pet').all():
-        item.pet.mark_available()
+    Pet.objects.filter(orderitem__order=instance).set_availability(True)
 
 
 @receiver(post_delete, sender=OrderItem)
-def order_item_delete_signal(sender, instance, **kwargs):
+def order_item_delete_signal(sender, instance, origin=None, **kwargs):
     """
     Signal to make pet available again when an order item is deleted individually.
     If the parent order has zero items after deletion, delete the order.
+    Items cascaded from an order delete are skipped: the order's pre_delete
+    has already released all of its pets in one UPDATE.
     """
-    if hasattr(instance, 'pet') and instance.pet:
-        instance.pet.mark_available()
+    if isinstance(origin, Order) or getattr(origin, 'model', None) is Order:
+        return
+    Pet.objects.filter(pk=instance.pet_id).set_availability(True)
     # Delete order if it has no items left
-    order = instance.order
-    if order.items.count() == 0:
-        order.delete()
+    if not OrderItem.objects.filter(order_id=instance.order_id).exists():
+        Order.objects.filter(pk=instance.order_id).delete()
 
 
+@receiver(post_save, sender=CartItem)
+def touch_cart_on_item_change(sender, instance, **kwargs):
+    """Adding or changing an item is cart activity, so it defers reaping."""
+    Cart.objects.filter(pk=instance.cart_id).update(updated_at=timezone.now())
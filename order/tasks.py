@@ -0,0 +1,8 @@
+from celery import shared_task
+from order.services import StaleOrderSweeper
+
+
+@shared_task
+def expire_stale_orders():
+    """Periodic sweep of stale pending orders and abandoned carts."""
+    return StaleOrderSweeper().run()
@@ -1,3 +1,424 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from api.testing import retry_on_lock
+from order.models import Cart, CartItem, Order, OrderItem
+from order.services import OrderService, StaleOrderSweeper
+from payment.models import TransactionHistory
+from payment.services import LedgerService
+from pet.models import Category, Pet, PetImage
+from users.models import AccountBalance, User
 
-# Create your tests here.
+
+class CreateOrderTests(TestCase):
+    # SAVEPOINT/RELEASE from the atomic block, pet read, pet claim UPDATE,
+    # balance UPDATE and read-back, order/items INSERTs, the payment entry
+    # INSERT and the three statements of the cart delete.
+    CHECKOUT_QUERIES = 12
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", password="secret", phone_number="01234567890"
+        )
+        AccountBalance.objects.filter(user=self.user).update(balance=Decimal("10000.00"))
+        self.category = Category.objects.create(name="Dog")
+
+    def make_cart(self, pet_count):
+        cart = Cart.objects.create(user=self.user)
+        for i in range(pet_count):
+            pet = Pet.objects.create(
+                name=f"Pet {i}", age=1, description="Friendly", price=Decimal("100.00"),
+                category=self.category,
+            )
+            CartItem.objects.create(cart=cart, pet=pet)
+        return cart
+
+    def test_query_count_is_independent_of_cart_size(self):
+        for pet_count in (1, 6):
+            cart = self.make_cart(pet_count)
+            with self.assertNumQueries(self.CHECKOUT_QUERIES):
+                order = OrderService.create_order(user=self.user, cart_id=cart.id)
+            self.assertEqual(order.items.count(), pet_count)
+
+    def test_checkout_debits_balance_and_reserves_pets(self):
+        cart = self.make_cart(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            order = OrderService.create_order(user=self.user, cart_id=cart.id)
+
+        self.assertEqual(order.status, Order.READY_TO_SHIP)
+        self.assertEqual(order.total_price, Decimal("300.00"))
+        self.assertFalse(Pet.objects.filter(availability_status=True).exists())
+        self.assertFalse(Cart.objects.filter(pk=cart.id).exists())
+        self.assertEqual(AccountBalance.objects.get(user=self.user).balance, Decimal("9700.00"))
+        payment = TransactionHistory.objects.get(order=order)
+        self.assertEqual(payment.transaction_type, TransactionHistory.PAYMENT)
+        self.assertEqual(payment.balance_after, Decimal("9700.00"))
+
+    def test_empty_cart_is_removed(self):
+        cart = self.make_cart(0)
+        with self.assertRaises(ValidationError) as raised:
+            OrderService.create_order(user=self.user, cart_id=cart.id)
+
+        self.assertIn("Cart has been removed", str(raised.exception.detail["cart_id"][0]))
+        self.assertFalse(Cart.objects.filter(pk=cart.id).exists())
+        self.assertFalse(Order.objects.exists())
+
+    def test_insufficient_balance_changes_nothing(self):
+        AccountBalance.objects.filter(user=self.user).update(balance=Decimal("50.00"))
+        cart = self.make_cart(2)
+        with self.assertRaises(ValidationError):
+            OrderService.create_order(user=self.user, cart_id=cart.id)
+
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Pet.objects.filter(availability_status=True).count(), 2)
+        self.assertEqual(AccountBalance.objects.get(user=self.user).balance, Decimal("50.00"))
+
+    def test_pet_taken_after_the_read_fails_the_checkout(self):
+        cart = self.make_cart(2)
+        contested = Pet.objects.first()
+        competitor = []
+
+        def another_checkout_claims_first(execute, sql, params, many, context):
+            # Lands between create_order's read of the pets and its claim.
+            if not competitor and sql.startswith('UPDATE "pet_pet"'):
+                competitor.append(contested.pk)
+                Pet.objects.filter(pk=contested.pk).update(availability_status=False)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(another_checkout_claims_first):
+            with self.assertRaises(ValidationError):
+                OrderService.create_order(user=self.user, cart_id=cart.id)
+
+        self.assertEqual(competitor, [contested.pk])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(AccountBalance.objects.get(user=self.user).balance, Decimal("10000.00"))
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    BUYERS = 6
+
+    def test_exactly_one_checkout_wins_a_contested_pet(self):
+        category = Category.objects.create(name="Dog")
+        pet = Pet.objects.create(
+            name="Rex", age=1, description="Friendly", price=Decimal("100.00"), category=category
+        )
+        carts = []
+        for index in range(self.BUYERS):
+            user = User.objects.create_user(
+                email=f"buyer{index}@example.com", password="secret", phone_number="01234567890"
+            )
+            AccountBalance.objects.filter(user=user).update(balance=Decimal("500.00"))
+            cart = Cart.objects.create(user=user)
+            CartItem.objects.create(cart=cart, pet=pet)
+            carts.append((user, cart.pk))
+
+        outcomes = []
+        start = threading.Barrier(self.BUYERS)
+
+        def checkout(user, cart_id):
+            try:
+                start.wait()
+                outcomes.append(retry_on_lock(OrderService.create_order, user, cart_id))
+            except ValidationError as exc:
+                outcomes.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=cart) for cart in carts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        orders = [outcome for outcome in outcomes if isinstance(outcome, Order)]
+        self.assertEqual(len(outcomes), self.BUYERS)
+        self.assertEqual(len(orders), 1)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderItem.objects.filter(pet=pet).count(), 1)
+        self.assertFalse(Pet.objects.get(pk=pet.pk).availability_status)
+        # Only the winner was charged.
+        self.assertEqual(
+            sorted(AccountBalance.objects.values_list("balance", flat=True)),
+            [Decimal("400.00")] + [Decimal("500.00")] * (self.BUYERS - 1),
+        )
+
+
+class StaleOrderSweeperTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", password="secret", phone_number="01234567890"
+        )
+        self.category = Category.objects.create(name="Dog")
+        self.stale = timezone.now() - timedelta(days=30)
+
+    def make_order(self, status=Order.PENDING, pet_count=2, created_at=None, paid=True, pets=None):
+        order = Order.objects.create(user=self.user, status=status, total_price=Decimal("100.00") * pet_count)
+        for i in range(pet_count):
+            pet = pets[i] if pets else Pet.objects.create(
+                name=f"Pet {i}", age=1, description="Friendly", price=Decimal("100.00"),
+                category=self.category, availability_status=False,
+            )
+            OrderItem.objects.create(order=order, pet=pet, price=pet.price, total_price=pet.price)
+        if paid:
+            LedgerService.deposit(self.user, order.total_price)
+            LedgerService.charge(self.user, order.total_price, order=order)
+        Order.objects.filter(pk=order.pk).update(created_at=created_at or self.stale)
+        return order
+
+    def sweep(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return StaleOrderSweeper(**kwargs).run()
+
+    def test_expires_stale_pending_orders_only(self):
+        stale = self.make_order()
+        recent = self.make_order(created_at=timezone.now())
+        shipped = self.make_order(status=Order.SHIPPED)
+
+        self.assertEqual(self.sweep(), {"orders": 1, "carts": 0})
+
+        statuses = dict(Order.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[stale.pk], Order.CANCELED)
+        self.assertEqual(statuses[recent.pk], Order.PENDING)
+        self.assertEqual(statuses[shipped.pk], Order.SHIPPED)
+        self.assertEqual(
+            set(Pet.objects.filter(availability_status=True).values_list("orderitem__order", flat=True)),
+            {stale.pk},
+        )
+        refund = TransactionHistory.objects.get(order=stale, transaction_type=TransactionHistory.REFUND)
+        self.assertEqual(refund.amount, Decimal("200.00"))
+        self.assertEqual(AccountBalance.objects.get(user=self.user).balance, Decimal("200.00"))
+
+    def test_refunds_only_paid_orders_not_yet_refunded(self):
+        unpaid = self.make_order(paid=False)
+        refunded = self.make_order()
+        LedgerService.refund(self.user, refunded.total_price, order=refunded)
+        balance = AccountBalance.objects.get(user=self.user).balance
+
+        self.assertEqual(self.sweep()["orders"], 2)
+
+        self.assertEqual(AccountBalance.objects.get(user=self.user).balance, balance)
+        self.assertFalse(TransactionHistory.objects.filter(order=unpaid).exists())
+        self.assertEqual(
+            TransactionHistory.objects.filter(order=refunded, transaction_type=TransactionHistory.REFUND).count(), 1
+        )
+
+    def test_pets_held_by_another_live_order_stay_unavailable(self):
+        stale = self.make_order()
+        shared, released = [item.pet for item in stale.items.order_by("pet__name")]
+        self.make_order(status=Order.READY_TO_SHIP, pet_count=1, pets=[shared], created_at=timezone.now())
+
+        self.sweep()
+
+        shared.refresh_from_db()
+        released.refresh_from_db()
+        self.assertFalse(shared.availability_status)
+        self.assertTrue(released.availability_status)
+
+    def test_batch_cost_does_not_depend_on_pet_count(self):
+        self.make_order(pet_count=1)
+        with CaptureQueriesContext(connection) as small:
+            StaleOrderSweeper(batch_size=1, max_batches=1).run()
+        self.make_order(pet_count=5)
+        with CaptureQueriesContext(connection) as large:
+            StaleOrderSweeper(batch_size=1, max_batches=1).run()
+        self.assertEqual(len(small), len(large))
+
+    def test_runs_are_bounded(self):
+        for _ in range(3):
+            self.make_order(pet_count=1)
+
+        self.assertEqual(self.sweep(batch_size=1, max_batches=2)["orders"], 2)
+        self.assertEqual(self.sweep(batch_size=1, max_batches=2)["orders"], 1)
+        self.assertFalse(Order.objects.filter(status=Order.PENDING).exists())
+
+    def test_command_reaps_abandoned_carts(self):
+        idle = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=idle, pet=self.make_order(status=Order.SHIPPED).items.first().pet)
+        Cart.objects.filter(pk=idle.pk).update(updated_at=self.stale)
+        active = Cart.objects.create(
+            user=User.objects.create_user(email="other@example.com", password="secret", phone_number="01234567890")
+        )
+
+        out = StringIO()
+        call_command("expire_stale_orders", stdout=out)
+
+        self.assertIn("reaped 1 abandoned carts", out.getvalue())
+        self.assertEqual(list(Cart.objects.values_list("pk", flat=True)), [active.pk])
+        self.assertFalse(CartItem.objects.exists())
+
+
+class CartReadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", password="secret", phone_number="01234567890"
+        )
+        self.category = Category.objects.create(name="Dog")
+        self.cart = Cart.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_pets(self, count):
+        for i in range(count):
+            pet = Pet.objects.create(
+                name=f"Pet {i}", age=1, description="Friendly", price=Decimal("100.00"),
+                category=self.category,
+            )
+            PetImage.objects.create(pet=pet, image=f"pets/{pet.pk}.jpg")
+            CartItem.objects.create(cart=self.cart, pet=pet)
+
+    def read(self, path, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_query_count_is_independent_of_cart_size(self):
+        detail, items = f"/api/v1/carts/{self.cart.pk}/", f"/api/v1/carts/{self.cart.pk}/items/"
+        # An empty cart has no pets whose images need prefetching.
+        self.assertEqual(self.read(detail, 2)["total_price"], Decimal("0.00"))
+        self.assertEqual(self.read(items, 1)["all_pet_price"], 0)
+
+        self.add_pets(1)
+        self.add_pets(4)
+
+        cart = self.read(detail, 3)
+        self.assertEqual(cart["total_price"], Decimal("500.00"))
+        self.assertEqual(len(cart["items"]), 5)
+        self.assertTrue(cart["items"][0]["pet"]["image"][0].endswith(".jpg"))
+        listing = self.read(items, 2)
+        self.assertEqual(listing["all_pet_price"], Decimal("500.00"))
+        self.assertEqual(len(listing["items"]), 5)
+
+
+class OrderListPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", password="secret", phone_number="01234567890"
+        )
+        other = User.objects.create_user(
+            email="other@example.com", password="secret", phone_number="01234567890"
+        )
+        Order.objects.create(user=other, total_price=Decimal("1.00"))
+        now = timezone.now()
+        self.orders = []
+        for i in range(25):
+            order = Order.objects.create(user=self.user, total_price=Decimal("1.00"))
+            Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(minutes=i))
+            self.orders.append(str(order.pk))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_is_unpaginated_by_default(self):
+        response = self.client.get("/api/v1/orders/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({order["id"] for order in response.data}, set(self.orders))
+
+    def test_cursor_pages_run_newest_first(self):
+        first = self.client.get("/api/v1/orders/", {"pagination": "cursor"}).data
+        second = self.client.get(first["next"]).data
+
+        self.assertEqual([order["id"] for order in first["results"]], self.orders[:20])
+        self.assertEqual([order["id"] for order in second["results"]], self.orders[20:])
+        self.assertIsNone(second["next"])
+
+
+class OrderStatusTransitionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="buyer@example.com", password="secret", phone_number="01234567890"
+        )
+        self.admin = User.objects.create_user(
+            email="admin@example.com", password="secret", phone_number="01234567890", is_staff=True
+        )
+        self.category = Category.objects.create(name="Dog")
+        self.client = APIClient()
+
+    def make_order(self, status=Order.READY_TO_SHIP, pet_count=2):
+        order = Order.objects.create(user=self.user, status=status, total_price=Decimal("100.00") * pet_count)
+        for i in range(pet_count):
+            pet = Pet.objects.create(
+                name=f"Pet {i}", age=1, description="Friendly", price=Decimal("100.00"),
+                category=self.category, availability_status=False,
+            )
+            OrderItem.objects.create(order=order, pet=pet, price=pet.price, total_price=pet.price)
+        return order
+
+    def availability(self, order):
+        return set(Pet.objects.filter(orderitem__order=order).values_list("availability_status", flat=True))
+
+    def update_status(self, order, status):
+        self.client.force_authenticate(self.admin)
+        return self.client.patch(f"/api/v1/orders/{order.pk}/update_status/", {"status": status}, format="json")
+
+    def test_cancel_releases_only_the_orders_pets(self):
+        order, other = self.make_order(), self.make_order()
+        untouched = dict(Pet.objects.filter(orderitem__order=other).values_list("pk", "updated_at"))
+
+        self.assertEqual(self.update_status(order, Order.CANCELED).status_code, 200)
+
+        self.assertEqual(self.availability(order), {True})
+        self.assertEqual(dict(Pet.objects.filter(orderitem__order=other).values_list("pk", "updated_at")), untouched)
+
+    def test_transition_cost_does_not_depend_on_pet_count(self):
+        small, large = self.make_order(pet_count=1), self.make_order(pet_count=6)
+        self.client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as small_queries:
+            self.update_status(small, Order.CANCELED)
+        with CaptureQueriesContext(connection) as large_queries:
+            self.update_status(large, Order.CANCELED)
+
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(self.availability(large), {True})
+
+    def test_shipping_keeps_pets_reserved_without_rewriting_them(self):
+        order = self.make_order()
+        before = dict(Pet.objects.filter(orderitem__order=order).values_list("pk", "updated_at"))
+
+        self.assertEqual(self.update_status(order, Order.SHIPPED).status_code, 200)
+
+        self.assertEqual(self.availability(order), {False})
+        # Pets already unavailable match no row of the UPDATE.
+        self.assertEqual(dict(Pet.objects.filter(orderitem__order=order).values_list("pk", "updated_at")), before)
+
+    def test_owner_can_cancel_an_order_that_has_not_shipped(self):
+        order = self.make_order(status=Order.PENDING)
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(f"/api/v1/orders/{order.pk}/cancel/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.get(pk=order.pk).status, Order.CANCELED)
+        self.assertEqual(self.availability(order), {True})
+
+    def test_shipped_and_canceled_orders_cannot_be_canceled(self):
+        shipped = self.make_order(status=Order.SHIPPED)
+        canceled = self.make_order(status=Order.CANCELED)
+        Pet.objects.filter(orderitem__order=canceled).update(availability_status=True)
+        self.client.force_authenticate(self.user)
+
+        for order, pets in ((shipped, {False}), (canceled, {True})):
+            response = self.client.post(f"/api/v1/orders/{order.pk}/cancel/")
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(Order.objects.get(pk=order.pk).status, order.status)
+            self.assertEqual(self.availability(order), pets)
+        self.assertFalse(TransactionHistory.objects.exists())
+
+    def test_deleting_an_order_or_an_item_releases_its_pets(self):
+        order, other = self.make_order(), self.make_order()
+        item, kept = other.items.all()
+        released = [*Pet.objects.filter(orderitem__order=order).values_list("pk", flat=True), item.pet_id]
+
+        order.delete()
+        item.delete()
+
+        self.assertEqual(set(Pet.objects.filter(pk__in=released).values_list("availability_status", flat=True)), {True})
+        self.assertFalse(Pet.objects.get(pk=kept.pet_id).availability_status)
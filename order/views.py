@@ -1,14 +1,27 @@
+from decimal import Decimal
+from django.db.models import Prefetch, Sum, Value, Window
+from django.db.models.functions import Coalesce
 from django.shortcuts import render
 from rest_framework.mixins import CreateModelMixin, RetrieveModelMixin, DestroyModelMixin
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 from order import serializers as orderSz
 from order.serializers import CartSerializer, CartItemSerializer, AddCartItemSerializer, UpdateCartItemSerializer, OrderItemSerializer
 from order.models import Cart, CartItem, Order, OrderItem
+from pet.models import PetImage
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import action
 from order.services import OrderService
 from rest_framework.response import Response
 from rest_framework import viewsets, permissions
+from pet.paginations import CreatedAtCursorPagination
+from api.idempotency import idempotent
+
+
+def cart_items_queryset():
+    """Cart items with everything SimplePetSerializer renders, in two queries."""
+    return CartItem.objects.select_related('pet').prefetch_related(
+        Prefetch('pet__images', queryset=PetImage.objects.filter(status=PetImage.READY))
+    )
 
 
 class CartViewSet(CreateModelMixin, RetrieveModelMixin, DestroyModelMixin, GenericViewSet):
@@ -53,7 +66,10 @@ class CartViewSet(CreateModelMixin, RetrieveModelMixin, DestroyModelMixin, Gener
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return Cart.objects.none()
-        return Cart.objects.prefetch_related('items__pet').filter(user=self.request.user)
+        # The total is summed by the database in the same SELECT as the cart.
+        return Cart.objects.filter(user=self.request.user).annotate(
+            total_price=Coalesce(Sum('items__pet__price'), Value(Decimal('0.00')))
+        ).prefetch_related(Prefetch('items', queryset=cart_items_queryset()))
 
 
 class CartItemViewSet(ModelViewSet):
@@ -69,13 +85,13 @@ class CartItemViewSet(ModelViewSet):
         }, status=201, headers=headers)
         
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        # Calculate total price of all pets in the cart
-        all_pet_price = sum(item.pet.price for item in queryset)
+        # Every row carries the cart total as a window aggregate, so the
+        # total costs no query of its own.
+        items = list(self.get_queryset().annotate(all_pet_price=Window(Sum('pet__price'))))
+        serializer = self.get_serializer(items, many=True)
         return Response({
             'items': serializer.data,
-            'all_pet_price': all_pet_price
+            'all_pet_price': items[0].all_pet_price if items else 0
         })
     """
     API endpoint that allows users to view, add, update, and delete items in a shopping cart.
@@ -109,7 +125,9 @@ class CartItemViewSet(ModelViewSet):
         return {'cart_id': self.kwargs.get('cart_pk')}
 
     def get_queryset(self):
-        return CartItem.objects.select_related('pet').filter(cart_id=self.kwargs.get('cart_pk'))
+        # Only reads render the pets; writes just need the item rows.
+        items = cart_items_queryset() if self.request.method == 'GET' else CartItem.objects
+        return items.filter(cart_id=self.kwargs.get('cart_pk'))
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -127,8 +145,11 @@ class OrderViewSet(ModelViewSet):
     OrderViewset handles CRUD operations and custom actions for Order objects in the Pet Adoptions system.
     Standard Endpoints:
     - list: Retrieve a list of orders. Admins see all orders; regular users see their own.
+      Pass `?pagination=cursor` for keyset pagination (newest first).
     - retrieve: Retrieve details of a specific order.
-    - create: Place a new order for pet adoption.
+    - create: Place a new order for pet adoption. Send an `Idempotency-Key`
+      header to make retries safe: a retry with the same key returns the
+      first response instead of placing a second order.
     - destroy: Delete an order (admin only).
     - partial_update: Partially update an order (admin only).
     Custom Actions:
@@ -138,6 +159,7 @@ class OrderViewSet(ModelViewSet):
     - Admins see all orders; regular users see only their own orders.
     """
     http_method_names = ['get', 'post', 'delete', 'patch', 'head', 'options']
+    pagination_class = CreatedAtCursorPagination
 
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
@@ -183,6 +205,10 @@ class OrderViewSet(ModelViewSet):
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def get_serializer_class(self):
         if self.action == 'cancel':
             return orderSz.EmptySerializer
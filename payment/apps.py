@@ -3,6 +3,3 @@ from django.apps import AppConfig
 class PaymentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'payment'
-
-    def ready(self):
-        import payment.signals
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0004_hot_query_indexes'),
+        ('payment', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transactionhistory',
+            index=models.Index(fields=['user', '-created_at', 'id'], name='txn_user_created_idx'),
+        ),
+        # Drop the single-column FK indexes only once the composites covering
+        # them exist.
+        migrations.AlterField(
+            model_name='transactionhistory',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
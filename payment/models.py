@@ -11,12 +11,18 @@ class TransactionHistory(models.Model):
         (PAYMENT, 'Payment'),
         (REFUND, 'Refund'),
     ]
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='transactions')
+    # Indexed through txn_user_created_idx.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='transactions', db_index=False)
     order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPE_CHOICES)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     balance_after = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at", "id"], name="txn_user_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.email} - {self.transaction_type} - {self.amount} at {self.created_at}"
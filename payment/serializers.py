@@ -1,5 +1,19 @@
 from rest_framework import serializers
 from .models import TransactionHistory
+from api.streaming import FORMATS
+
+class TransactionExportSerializer(serializers.Serializer):
+    """Query parameters of the streaming transaction export."""
+
+    export_format = serializers.ChoiceField(choices=FORMATS, default="jsonl")
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if "start" in attrs and "end" in attrs and attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError({"end": ["Must not be before start."]})
+        return attrs
+
 
 class TransactionHistorySerializer(serializers.ModelSerializer):
     class Meta:
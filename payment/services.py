@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from users.models import AccountBalance
+from payment.models import TransactionHistory
+
+
+class LedgerService:
+    """
+    Applies balance movements as single-statement F() updates on the account
+    row. The UPDATE holds the row lock until commit, so concurrent deposits
+    and checkouts queue on the row instead of overwriting each other.
+    The matching TransactionHistory entry is written in the same transaction,
+    under the row lock, so a movement never commits without its entry and
+    history ordered by created_at replays every balance exactly.
+    Nested calls join the caller's transaction without a savepoint: a failed
+    movement writes nothing and is meant to abort the whole operation.
+    """
+
+    @staticmethod
+    @transaction.atomic(savepoint=False)
+    def deposit(user, amount):
+        """Credits a deposit and counts it towards add_money."""
+        if not LedgerService._update(user, amount, count_as_added=True):
+            AccountBalance.objects.get_or_create(user=user)
+            LedgerService._update(user, amount, count_as_added=True)
+        return LedgerService._record(user, TransactionHistory.DEPOSIT, amount)
+
+    @staticmethod
+    def charge(user, amount, order=None):
+        """Debits a payment, refusing it when the balance does not cover it."""
+        with transaction.atomic(savepoint=False):
+            if LedgerService._update(user, -amount, require_funds=True):
+                return LedgerService._record(user, TransactionHistory.PAYMENT, amount, order)
+        # Raised outside the block: the refused UPDATE wrote nothing, so the
+        # caller's transaction stays usable.
+        raise ValidationError("Insufficient balance.")
+
+    @staticmethod
+    @transaction.atomic(savepoint=False)
+    def refund(user, amount, order=None):
+        """Credits a refund back to both balance and add_money."""
+        if not LedgerService._update(user, amount, count_as_added=True):
+            AccountBalance.objects.get_or_create(user=user)
+            LedgerService._update(user, amount, count_as_added=True)
+        return LedgerService._record(user, TransactionHistory.REFUND, amount, order)
+
+    @staticmethod
+    def _update(user, delta, count_as_added=False, require_funds=False):
+        accounts = AccountBalance.objects.filter(user=user)
+        if require_funds:
+            accounts = accounts.filter(balance__gte=-delta)
+        changes = {"balance": F("balance") + delta, "updated_at": timezone.now()}
+        if count_as_added:
+            changes["add_money"] = F("add_money") + delta
+        return accounts.update(**changes)
+
+    @staticmethod
+    def _record(user, transaction_type, amount, order=None):
+        # Read back inside the transaction, after the UPDATE took the row lock,
+        # so balance_after is exactly the balance this movement produced.
+        account = AccountBalance.objects.get(user=user)
+        TransactionHistory.objects.create(
+            user=user,
+            transaction_type=transaction_type,
+            amount=amount,
+            balance_after=account.balance,
+            order=order,
+        )
+        return account
@@ -1,20 +1,73 @@
+from datetime import datetime, time, timedelta
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import TransactionHistory
-from .serializers import TransactionHistorySerializer
+from .serializers import TransactionExportSerializer, TransactionHistorySerializer
+from api.streaming import CONTENT_TYPES, render_rows
+from pet.paginations import CreatedAtCursorPagination
+
+EXPORT_FIELDS = ["id", "transaction_type", "amount", "balance_after", "order", "created_at"]
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_rows(queryset):
+    """Yields plain rows from a server-side cursor, EXPORT_CHUNK_SIZE at a time."""
+    for row in queryset.values(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row["created_at"] = row["created_at"].isoformat()
+        yield row
 
 
 class TransactionHistoryViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    The authenticated user's balance movements, newest first.
+    - list: The whole history as `{"count", "results"}`. Pass
+      `?pagination=cursor` for keyset pages of 20 (newest first).
+    - retrieve: A single movement.
+    - export: Streams the whole history as JSON Lines (default) or CSV with
+      `?export_format=jsonl|csv`, optionally limited to `?start=` and
+      `?end=` dates (inclusive, YYYY-MM-DD).
+    """
+
     serializer_class = TransactionHistorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         return TransactionHistory.objects.filter(user=self.request.user).order_by("-created_at")
 
     def list(self, request, *args, **kwargs):
         qs = self.get_queryset()
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(qs, many=True)
+        data = serializer.data
         return Response({
-            "count": qs.count(),
-            "results": serializer.data,
-        })
\ No newline at end of file
+            "count": len(data),
+            "results": data,
+        })
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        params = TransactionExportSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        fmt = params.validated_data["export_format"]
+
+        # Bounds on created_at itself keep the (user, -created_at) index usable.
+        queryset = self.get_queryset().order_by("-created_at", "id")
+        if "start" in params.validated_data:
+            start = datetime.combine(params.validated_data["start"], time.min)
+            queryset = queryset.filter(created_at__gte=timezone.make_aware(start))
+        if "end" in params.validated_data:
+            end = datetime.combine(params.validated_data["end"] + timedelta(days=1), time.min)
+            queryset = queryset.filter(created_at__lt=timezone.make_aware(end))
+
+        response = StreamingHttpResponse(
+            render_rows(export_rows(queryset), fmt, EXPORT_FIELDS), content_type=CONTENT_TYPES[fmt]
+        )
+        response["Content-Disposition"] = f'attachment; filename="transactions.{fmt}"'
+        return response
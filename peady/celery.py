@@ -0,0 +1,34 @@
+import logging
+import os
+
+from celery import Celery
+from celery.contrib.django.task import DjangoTask
+from django.db import transaction
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "peady.settings")
+
+logger = logging.getLogger(__name__)
+
+
+class OnCommitTask(DjangoTask):
+    """
+    Queues `delay_on_commit` calls without letting a broker failure escape.
+    By then the transaction has committed, so raising would only turn a
+    successful request into a 500; the failure is logged instead. Arguments
+    are left out of the log, since email payloads carry tokens.
+    """
+
+    def delay_on_commit(self, *args, **kwargs):
+        def publish():
+            try:
+                self.delay(*args, **kwargs)
+            except Exception:
+                logger.exception("Could not queue %s after commit.", self.name)
+
+        transaction.on_commit(publish)
+
+
+app = Celery("peady", task_cls=OnCommitTask)
+# Every CELERY_* Django setting configures the app.
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
@@ -0,0 +1,118 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from rest_framework.serializers import BaseSerializer
+
+
+logger = logging.getLogger("peady.profiling")
+
+# Profile of the request currently being handled, None when it is not sampled.
+_current_profile = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self._serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed as a database execute wrapper, so it sees every query
+        # without relying on DEBUG's query log.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+def _timed_data(data):
+    """
+    Wraps `BaseSerializer.data` so sampled requests accumulate the time spent
+    building response data. Nested serializers are only counted once; lazy
+    queries run while serializing count towards both db and serializer time.
+    """
+
+    def wrapper(serializer):
+        profile = _current_profile.get()
+        if profile is None or profile._serializing:
+            return data.fget(serializer)
+        profile._serializing = True
+        started = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            profile.serializer_time += time.perf_counter() - started
+            profile._serializing = False
+
+    wrapper._profiled = True
+    return property(wrapper)
+
+
+def install_serializer_timer():
+    if not getattr(BaseSerializer.data.fget, "_profiled", False):
+        BaseSerializer.data = _timed_data(BaseSerializer.data)
+
+
+class RequestProfilingMiddleware:
+    """
+    Samples PROFILING_SAMPLE_RATE of requests and records query count, DB
+    time, serializer time and total time per view/action. Results go to the
+    "peady.profiling" logger and, with PROFILING_SERVER_TIMING, to a
+    Server-Timing response header. Unsampled requests only pay for one
+    random() call.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_serializer_timer()
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        try:
+            with connection.execute_wrapper(profile):
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        total_time = time.perf_counter() - profile.started
+
+        match = request.resolver_match
+        view, actions = None, {}
+        if match is not None:
+            view = match.view_name
+            actions = getattr(match.func, "actions", None) or {}
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": view,
+            "action": actions.get(request.method.lower()),
+            "status": response.status_code,
+            "queries": profile.queries,
+            "db_ms": round(profile.db_time * 1000, 2),
+            "serializer_ms": round(profile.serializer_time * 1000, 2),
+            "total_ms": round(total_time * 1000, 2),
+        }
+        logger.info(
+            " ".join(f"{key}={value}" for key, value in record.items()),
+            extra={"profile": record},
+        )
+        if settings.PROFILING_SERVER_TIMING:
+            response["Server-Timing"] = ", ".join(
+                [
+                    f'db;dur={record["db_ms"]};desc="{profile.queries} queries"',
+                    f'serializer;dur={record["serializer_ms"]}',
+                    f'total;dur={record["total_ms"]}',
+                ]
+            )
+        return response
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "cloudinary",
     "cloudinary_storage",
     "whitenoise.runserver_nostatic",
@@ -65,7 +66,6 @@ INSTALLED_APPS = [
     "order",
     "users",
     "payment",
-    "debug_toolbar",
 ]
 
 AUTH_USER_MODEL = "users.User"
@@ -77,8 +77,8 @@ INTERNAL_IPS = [
 ]
 
 MIDDLEWARE = [
+    "peady.middleware.RequestProfilingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware", 
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -89,12 +89,80 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# debug_toolbar only helps with browser sessions while developing.
+if DEBUG:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.insert(2, "debug_toolbar.middleware.DebugToolbarMiddleware")
+
+# Share of requests profiled by RequestProfilingMiddleware (0 disables it),
+# and whether profiled responses carry a Server-Timing header. The header
+# exposes internal timings to clients, so it is off unless DEBUG is on.
+PROFILING_SAMPLE_RATE = config("PROFILING_SAMPLE_RATE", default=0.01, cast=float)
+PROFILING_SERVER_TIMING = config("PROFILING_SERVER_TIMING", default=DEBUG, cast=bool)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "peady.profiling": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
 # Media files (Uploaded images, etc.)
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
 DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
 
+# Where pet images are stored; pet.uploads.LocalImageBackend keeps them under
+# MEDIA_ROOT for offline development and tests.
+PET_IMAGE_BACKEND = config("PET_IMAGE_BACKEND", default="pet.uploads.CloudinaryImageBackend")
+# Asynchronous uploads wait here until a worker sends them to the backend,
+# so Celery workers must share this directory with the web processes.
+PET_IMAGE_STAGING_DIR = config("PET_IMAGE_STAGING_DIR", default=str(BASE_DIR / "staging"))
+
+# Background tasks (see peady/celery.py). Without a broker configured, tasks
+# run in-process as soon as the transaction that queued them commits, which
+# is also how the test suite runs them.
+CELERY_BROKER_URL = config("CELERY_BROKER_URL", default="memory://")
+CELERY_TASK_ALWAYS_EAGER = config(
+    "CELERY_TASK_ALWAYS_EAGER", default=CELERY_BROKER_URL == "memory://", cast=bool
+)
+CELERY_TASK_SERIALIZER = "json"
+CELERY_ACCEPT_CONTENT = ["json"]
+# Acknowledge after the task ran, so a worker crash redelivers it.
+CELERY_TASK_ACKS_LATE = True
+# Periodic tasks, run by `celery -A peady beat`.
+CELERY_BEAT_SCHEDULE = {
+    "expire-stale-orders": {
+        "task": "order.tasks.expire_stale_orders",
+        "schedule": config("STALE_SWEEP_INTERVAL", default=900, cast=int),
+    },
+    "purge-idempotency-records": {
+        "task": "api.tasks.purge_idempotency_records",
+        "schedule": 3600,
+    },
+}
+
+# How long a response stored for an Idempotency-Key is replayed to retries.
+IDEMPOTENCY_KEY_TTL = timedelta(hours=config("IDEMPOTENCY_KEY_TTL_HOURS", default=24, cast=int))
+# How long a request that is still running holds its key. A request that
+# died without storing a response frees the key once this has passed.
+IDEMPOTENCY_IN_PROGRESS_TIMEOUT = timedelta(
+    seconds=config("IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS", default=60, cast=int)
+)
+
+# Pending orders older than this are canceled and refunded, and carts idle
+# for longer than this are deleted (order.services.StaleOrderSweeper).
+PENDING_ORDER_TTL = timedelta(hours=config("PENDING_ORDER_TTL_HOURS", default=24, cast=int))
+ABANDONED_CART_TTL = timedelta(days=config("ABANDONED_CART_TTL_DAYS", default=7, cast=int))
+# Rows per transaction and transactions per run, bounding one sweep's cost.
+STALE_SWEEP_BATCH_SIZE = config("STALE_SWEEP_BATCH_SIZE", default=200, cast=int)
+STALE_SWEEP_MAX_BATCHES = config("STALE_SWEEP_MAX_BATCHES", default=10, cast=int)
+
 ROOT_URLCONF = "peady.urls"
 
 TEMPLATES = [
@@ -129,6 +197,32 @@ DATABASES = {
 }
    
 
+# Cache setup. The default local-memory cache is per process; point
+# CACHE_BACKEND/CACHE_LOCATION at a shared cache (e.g. Redis) in production.
+CACHE_BACKEND = config(
+    "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+)
+CACHE_LOCATION = config("CACHE_LOCATION", default="peady")
+
+# The catalog cache must be shared by every worker: a version bump in one
+# process never reaches another's local memory, which would keep serving stale
+# availability. Outside DEBUG (a single runserver process) a local-memory
+# backend therefore turns catalog caching off.
+CATALOG_CACHE_BACKEND = (
+    "django.core.cache.backends.dummy.DummyCache"
+    if CACHE_BACKEND.endswith("LocMemCache") and not DEBUG
+    else CACHE_BACKEND
+)
+
+CACHES = {
+    "default": {"BACKEND": CACHE_BACKEND, "LOCATION": CACHE_LOCATION},
+    "catalog": {"BACKEND": CATALOG_CACHE_BACKEND, "LOCATION": CACHE_LOCATION},
+}
+
+# Seconds a cached catalog page may live; catalog changes invalidate it earlier.
+CATALOG_CACHE_TIMEOUT = config("CATALOG_CACHE_TIMEOUT", default=300, cast=int)
+
+
 # cloudinary settings
 cloudinary.config(
     cloud_name=config("CLOUD_NAME"),
@@ -209,6 +303,7 @@ DJOSER = {
     "LOGOUT_ON_PASSWORD_CHANGE": True,
     "PASSWORD_RESET_CONFIRM_RETYPE": True,
     "PASSWORD_RESET_CONFIRM_URL": "password-reset/{uid}/{token}",
+    "USERNAME_RESET_CONFIRM_URL": "username-reset/{uid}/{token}",
     "TOKEN_MODEL": None,
     "PERMISSIONS": {
         "activation": ["rest_framework.permissions.AllowAny"],
@@ -222,6 +317,15 @@ DJOSER = {
         "token_create": ["rest_framework.permissions.AllowAny"],
         "token_destroy": ["rest_framework.permissions.IsAuthenticated"],
     },
+    # Rendered in the request, sent by users.tasks.send_email after commit.
+    "EMAIL": {
+        "activation": "users.email.ActivationEmail",
+        "confirmation": "users.email.ConfirmationEmail",
+        "password_reset": "users.email.PasswordResetEmail",
+        "password_changed_confirmation": "users.email.PasswordChangedConfirmationEmail",
+        "username_changed_confirmation": "users.email.UsernameChangedConfirmationEmail",
+        "username_reset": "users.email.UsernameResetEmail",
+    },
     "SERIALIZERS": {
         "user_create": "users.serializers.UserCreateSerializer",
         "user": "users.serializers.UserCreateSerializer",
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PetConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pet'
+
+    def ready(self):
+        import pet.signals
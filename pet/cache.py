@@ -0,0 +1,73 @@
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.connection import ConnectionProxy
+
+CATALOG_VERSION_KEY = "pet:catalog:version"
+CATALOG_CHANGED_AT_KEY = "pet:catalog:changed_at"
+
+# Everything catalog-related lives in the "catalog" cache, which settings turn
+# into a no-op when no shared backend is configured.
+catalog_cache = ConnectionProxy(caches, "catalog")
+
+
+def get_catalog_version():
+    """Returns the current catalog version, seeding it on first use."""
+    version = catalog_cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a counter lost to eviction can never
+        # collide with versions that still have pages cached.
+        catalog_cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = catalog_cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def get_catalog_changed_at():
+    """
+    Returns when the catalog last changed. A time lost to eviction, or never
+    kept because catalog caching is off, restarts from now, which only costs
+    clients a full response.
+    """
+    changed_at = catalog_cache.get(CATALOG_CHANGED_AT_KEY)
+    if changed_at is None:
+        catalog_cache.add(CATALOG_CHANGED_AT_KEY, timezone.now(), timeout=None)
+        changed_at = catalog_cache.get(CATALOG_CHANGED_AT_KEY)
+    return changed_at or timezone.now()
+
+
+def bump_catalog_version():
+    """Moves the catalog to a new version so every cached page goes stale."""
+    catalog_cache.set(CATALOG_CHANGED_AT_KEY, timezone.now(), timeout=None)
+    try:
+        return catalog_cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        return get_catalog_version()
+
+
+def bump_catalog_version_on_commit():
+    """
+    Bumps the version once the current transaction commits. Bumping earlier
+    would let a reader cache the pre-commit rows under the new version,
+    where they would outlive the write until CATALOG_CACHE_TIMEOUT.
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+def catalog_cache_key(prefix, request, ignore=()):
+    """
+    Builds a cache key from the current version, the query string minus the
+    `ignore`d parameters and whether the caller is staff, since staff see
+    unfiltered listings.
+    """
+    query = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        if key not in ignore
+        for value in values
+    )
+    digest = hashlib.md5(repr(query).encode()).hexdigest()
+    audience = "staff" if request.user.is_staff else "public"
+    return f"pet:catalog:{get_catalog_version()}:{prefix}:{audience}:{digest}"
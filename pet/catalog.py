@@ -0,0 +1,126 @@
+"""
+The read path shared by every pet catalog route.
+A listing is resolved in two cached steps: the filtered, searched and ordered
+queryset is read into a plan of (id, updated_at) pairs, and rows are then
+rendered per pet. A page only reads its own slice of the plan (LIMIT/OFFSET
+plus a COUNT), the unpaginated `all_pets` view reads it whole, and rows are
+shared between routes and pages.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Prefetch
+from api.utils import batched
+from pet.cache import catalog_cache, catalog_cache_key
+from pet.models import Pet, PetImage
+
+# Query parameters that only choose how a plan is presented, not which pets
+# it holds, so they are left out of the plan key.
+PRESENTATION_PARAMS = {"page", "pagination", "cursor", "fields", "view"}
+# Missing rows are loaded with one `pk IN (...)` query per this many pets.
+ROW_BATCH_SIZE = 1000
+
+
+def pet_catalog_queryset(fields):
+    """Pets with only the relations and heavy columns that `fields` render."""
+    # search_vector is only read by the database, so never load it.
+    queryset = Pet.objects.defer("search_vector")
+    if "description" not in fields:
+        queryset = queryset.defer("description")
+    if "category_name" in fields:
+        queryset = queryset.select_related("category")
+    if fields & {"pet_images", "thumbnail"}:
+        queryset = queryset.prefetch_related(
+            Prefetch("images", queryset=PetImage.objects.filter(status=PetImage.READY))
+        )
+    return queryset
+
+
+class CatalogPlan:
+    """
+    The ordered (id, updated_at) pairs of a filtered queryset, read and
+    cached one slice at a time, so a page never loads the whole filtered
+    set. Paginators use it like a list; a plan read whole by an unpaginated
+    listing also serves the pages of the same query.
+    """
+
+    def __init__(self, queryset, key):
+        # Ties in the requested ordering would let OFFSET pages overlap.
+        ordering = queryset.query.order_by
+        if ordering and "id" not in ordering and "pk" not in ordering:
+            queryset = queryset.order_by(*ordering, "id")
+        self.queryset = queryset
+        self.key = key
+        self.entries = catalog_cache.get(f"{key}:all")
+
+    def all(self):
+        if self.entries is None:
+            self.entries = self.cached("all", lambda: list(self.queryset.values_list("id", "updated_at")))
+        return self.entries
+
+    def count(self):
+        if self.entries is not None:
+            return len(self.entries)
+        return self.cached("count", self.queryset.count)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, bounds):
+        if self.entries is not None:
+            return self.entries[bounds]
+        return self.cached(
+            f"{bounds.start}:{bounds.stop}",
+            lambda: list(self.queryset.values_list("id", "updated_at")[bounds]),
+        )
+
+    def cached(self, suffix, load):
+        key = f"{self.key}:{suffix}"
+        value = catalog_cache.get(key)
+        if value is None:
+            value = load()
+            catalog_cache.set(key, value, settings.CATALOG_CACHE_TIMEOUT)
+        return value
+
+
+class PetCatalog:
+    """
+    Cached plans and rows for a catalog view. Plans are keyed on the catalog
+    version, so any catalog change rebuilds them; rows are keyed on the pet's
+    `updated_at`, so only the pets that changed are rendered again.
+    """
+
+    def __init__(self, view):
+        self.view = view
+        self.request = view.request
+
+    def plan(self):
+        """Returns the CatalogPlan of the pets matching the request."""
+        key = catalog_cache_key("plan", self.request, ignore=PRESENTATION_PARAMS)
+        return CatalogPlan(self.view.filter_queryset(Pet.objects.all()), key)
+
+    def rows(self, entries):
+        """Returns the rendered rows of `entries`, loading only cache misses."""
+        variant = self.variant()
+        keys = {self.row_key(variant, pk, updated_at): pk for pk, updated_at in entries}
+        rows = {keys[key]: row for key, row in catalog_cache.get_many(keys).items()}
+        missing = [pk for pk, _ in entries if pk not in rows]
+        fields = self.view.get_rendered_fields()
+        for batch in batched(missing, ROW_BATCH_SIZE):
+            pets = list(pet_catalog_queryset(fields).filter(pk__in=batch))
+            fresh = {}
+            for pet, row in zip(pets, self.view.get_serializer(pets, many=True).data):
+                rows[pet.pk] = fresh[self.row_key(variant, pet.pk, pet.updated_at)] = dict(row)
+            catalog_cache.set_many(fresh, settings.CATALOG_CACHE_TIMEOUT)
+        # Pets deleted since the plan was cached are simply left out.
+        return [rows[pk] for pk, _ in entries if pk in rows]
+
+    def variant(self):
+        """Identifies the serializer and field set a row was rendered with."""
+        serializer_class = self.view.get_serializer_class()
+        fields = ",".join(sorted(self.view.get_rendered_fields()))
+        return hashlib.md5(f"{serializer_class.__name__}|{fields}".encode()).hexdigest()
+
+    @staticmethod
+    def row_key(variant, pk, updated_at):
+        return f"pet:catalog:row:{variant}:{pk}:{updated_at.timestamp()}"
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from pet.cache import bump_catalog_version
+from pet.models import PetImage
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the precomputed url/thumbnail_url columns of pet images. "
+        "Only images without URLs are touched unless --all is given, e.g. "
+        "after changing PetImage.THUMBNAIL_TRANSFORMATION."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Rebuild URLs for every image.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        images = PetImage.objects.only("id", "image").order_by("id")
+        if not options["all"]:
+            images = images.filter(url="")
+
+        batch_size = options["batch_size"]
+        batch, updated = [], 0
+        for image in images.iterator(chunk_size=batch_size):
+            image.fill_urls()
+            batch.append(image)
+            if len(batch) == batch_size:
+                updated += PetImage.objects.bulk_update(batch, ["url", "thumbnail_url"])
+                batch = []
+        if batch:
+            updated += PetImage.objects.bulk_update(batch, ["url", "thumbnail_url"])
+
+        if updated:
+            # bulk_update skips the signals, so drop cached catalog pages here.
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"Updated URLs for {updated} pet images."))
@@ -0,0 +1,44 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from api.streaming import FORMATS
+from pet.transfer import PetImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports pets from a CSV or JSONL file (or - for stdin) in batches. "
+        "Rows with an id update that pet, rows without one create a pet; "
+        "categories are matched by name."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to read, or - for stdin.")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension, else csv.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--create-categories", action="store_true",
+                            help="Create unknown categories instead of rejecting their rows.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or detect_format(path)
+        importer = PetImporter(options["batch_size"], options["create_categories"])
+
+        started = time.perf_counter()
+        try:
+            stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        except OSError as error:
+            raise CommandError(error)
+        with stream:
+            importer.run(read_rows(stream, fmt))
+        elapsed = time.perf_counter() - started
+
+        for line_number, message in importer.errors:
+            self.stderr.write(f"line {line_number}: {message}")
+        if importer.rejected > len(importer.errors):
+            self.stderr.write(f"... and {importer.rejected - len(importer.errors)} more rejected rows.")
+        rows = importer.created + importer.updated
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {rows} pets ({importer.created} created, {importer.updated} updated, "
+            f"{importer.rejected} rejected) in {elapsed:.1f}s, {rows / max(elapsed, 1e-9):.0f} rows/s."
+        ))
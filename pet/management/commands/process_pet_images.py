@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from pet.services import PetImageService
+
+
+class Command(BaseCommand):
+    help = (
+        "Uploads pending pet images from local staging. Run it from cron to "
+        "pick up images whose process_pet_image task never completed."
+    )
+
+    def handle(self, *args, **options):
+        handled = PetImageService.process_pending()
+        self.stdout.write(self.style.SUCCESS(f"Processed {handled} pending pet images."))
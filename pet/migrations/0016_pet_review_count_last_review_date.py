@@ -0,0 +1,40 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:24
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_review_stats(apps, schema_editor):
+    Pet = apps.get_model("pet", "Pet")
+    Review = apps.get_model("pet", "Review")
+    per_pet = Review.objects.filter(pet=OuterRef("pk")).order_by().values("pet")
+    Pet.objects.update(
+        review_count=Coalesce(
+            Subquery(per_pet.annotate(total=Count("id")).values("total")),
+            0,
+            output_field=IntegerField(),
+        ),
+        last_review_date=Subquery(per_pet.annotate(last=Max("date")).values("last")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pet', '0015_category_updated_at_review_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pet',
+            name='last_review_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:33
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+# Full-text search only exists on Postgres; elsewhere the column stays empty
+# and PetSearchFilter falls back to icontains.
+CREATE_INDEXES = [
+    "CREATE INDEX pet_pet_search_vector_gin ON pet_pet USING gin (search_vector)",
+    "CREATE INDEX pet_pet_name_trgm ON pet_pet USING gin (name gin_trgm_ops)",
+]
+DROP_INDEXES = [
+    "DROP INDEX IF EXISTS pet_pet_search_vector_gin",
+    "DROP INDEX IF EXISTS pet_pet_name_trgm",
+]
+
+
+def backfill_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Pet = apps.get_model("pet", "Pet")
+    Category = apps.get_model("pet", "Category")
+    category_name = Category.objects.filter(pk=OuterRef("category_id")).values("name")
+    Pet.objects.update(
+        search_vector=SearchVector("name", weight="A", config="english")
+        + SearchVector(Subquery(category_name), weight="B", config="english")
+        + SearchVector("description", weight="C", config="english")
+    )
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for sql in CREATE_INDEXES:
+            schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for sql in DROP_INDEXES:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pet', '0016_pet_review_count_last_review_date'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='pet',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pet', '0017_pet_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['category', 'price'], name='pet_category_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(condition=models.Q(('availability_status', True)), fields=['category', 'price'], name='pet_avail_category_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(condition=models.Q(('availability_status', True)), fields=['price', 'id'], name='pet_avail_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(condition=models.Q(('availability_status', True)), fields=['id'], name='pet_avail_id_idx'),
+        ),
+        # Drop the single-column FK indexes only once the composites covering
+        # them exist.
+        migrations.AlterField(
+            model_name='pet',
+            name='category',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='pet', to='pet.category'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pet', '0018_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='petimage',
+            name='thumbnail_url',
+            field=models.URLField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='petimage',
+            name='url',
+            field=models.URLField(blank=True, editable=False, max_length=500),
+        ),
+    ]
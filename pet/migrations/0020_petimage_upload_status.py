@@ -0,0 +1,35 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:45
+
+import cloudinary.models
+import pet.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pet', '0019_petimage_urls'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='petimage',
+            name='error',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='petimage',
+            name='staged_file',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='petimage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='ready', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='petimage',
+            name='image',
+            field=cloudinary.models.CloudinaryField(blank=True, max_length=255, validators=[pet.validators.validate_file_size], verbose_name='image'),
+        ),
+    ]
@@ -1,30 +1,114 @@
 from django.conf import settings
-from django.db import models
+from django.core.files import File
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import connections, models
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
 from cloudinary.models import CloudinaryField
 from pet.validators import validate_file_size
+from pet.cache import bump_catalog_version_on_commit
+from pet.uploads import get_image_backend
 
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
 
+# Text search configuration used for both the stored vectors and the queries.
+SEARCH_CONFIG = "english"
+
+
+class PetQuerySet(models.QuerySet):
+    def update_catalog(self, **changes):
+        """
+        UPDATE that keeps updated_at current and, since querysets bypass the
+        model signals, invalidates the catalog cache itself.
+        Returns the number of pets changed.
+        """
+        changed = self.update(updated_at=timezone.now(), **changes)
+        if changed:
+            bump_catalog_version_on_commit()
+        return changed
+
+    def refresh_search_vector(self):
+        """
+        Rebuilds search_vector (name, category name, description, weighted in
+        that order) for every matching pet in a single UPDATE. The column only
+        exists for Postgres full-text search, so this is a no-op elsewhere.
+        """
+        if connections[self.db].vendor != "postgresql":
+            return 0
+        category_name = Category.objects.filter(pk=OuterRef("category_id")).values("name")
+        return self.update(
+            search_vector=SearchVector("name", weight="A", config=SEARCH_CONFIG)
+            + SearchVector(Subquery(category_name), weight="B", config=SEARCH_CONFIG)
+            + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+        )
+
+    def set_availability(self, available):
+        """Sets availability for every matching pet in a single UPDATE."""
+        return self.exclude(availability_status=available).update_catalog(
+            availability_status=available
+        )
+
+    def claim(self):
+        """
+        Reserves every matching pet that is still available with a single
+        conditional UPDATE and returns how many were claimed. Concurrent
+        claims on the same pet are decided by the row lock the UPDATE
+        takes: whoever comes second matches no row, so the caller compares
+        the count with what it asked for instead of locking beforehand.
+        """
+        return self.filter(availability_status=True).update_catalog(availability_status=False)
+
+
 class Pet(models.Model):
     name = models.CharField(max_length=50)
     age = models.DecimalField(max_digits=3, decimal_places=1)
     description = models.TextField()
     breed = models.BooleanField(default=False)
     price = models.DecimalField(max_digits=10, decimal_places=2)
-    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="pet")
+    # Indexed through pet_category_price_idx.
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="pet", db_index=False)
     availability_status = models.BooleanField(default=True)
+    # Maintained by the Review signals so catalog pages need no aggregate.
+    review_count = models.PositiveIntegerField(default=0)
+    last_review_date = models.DateField(blank=True, null=True)
+    # Kept current by the Pet/Category signals; GIN indexed on Postgres.
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PetQuerySet.as_manager()
+
     class Meta:
         ordering = ['id']
+        indexes = [
+            # Category + price range filters, ordered by price.
+            models.Index(fields=["category", "price"], name="pet_category_price_idx"),
+            # The public catalog mostly lists available pets, a small share of
+            # the table, so these partial indexes stay small.
+            models.Index(
+                fields=["category", "price"],
+                condition=models.Q(availability_status=True),
+                name="pet_avail_category_price_idx",
+            ),
+            models.Index(
+                fields=["price", "id"],
+                condition=models.Q(availability_status=True),
+                name="pet_avail_price_idx",
+            ),
+            models.Index(
+                fields=["id"],
+                condition=models.Q(availability_status=True),
+                name="pet_avail_id_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -43,18 +127,68 @@ class Pet(models.Model):
 
 
 class PetImage(models.Model):
+    # Cloudinary transformation for list/grid thumbnails; format and quality
+    # are negotiated per client so mobile gets small files.
+    THUMBNAIL_TRANSFORMATION = {
+        "width": 300,
+        "height": 300,
+        "crop": "fill",
+        "fetch_format": "auto",
+        "quality": "auto",
+    }
+
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (READY, "Ready"),
+        (FAILED, "Failed"),
+    ]
+
     pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name="images")
-    image = CloudinaryField('image', validators=[validate_file_size])
+    # Empty while an asynchronous upload is pending.
+    image = CloudinaryField('image', validators=[validate_file_size], blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=READY)
+    # Name of the file in PET_IMAGE_STAGING_DIR awaiting upload.
+    staged_file = models.CharField(max_length=255, blank=True, editable=False)
+    error = models.CharField(max_length=255, blank=True, editable=False)
+    # Built once when the image is saved so serializers read plain columns
+    # instead of asking Cloudinary to build URLs for every row.
+    url = models.URLField(max_length=500, blank=True, editable=False)
+    thumbnail_url = models.URLField(max_length=500, blank=True, editable=False)
 
     def __str__(self):
         return f"Image for {self.pet.name}"
 
+    def save(self, *args, **kwargs):
+        # Upload a new file now so the URLs are final and written by the
+        # same INSERT/UPDATE.
+        if isinstance(self.image, File):
+            self.image = get_image_backend().upload(self.image)
+        self.fill_urls()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "image" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "url", "thumbnail_url"}
+        super().save(*args, **kwargs)
+
+    def fill_urls(self):
+        """Sets url/thumbnail_url from the stored Cloudinary resource."""
+        resource = self._meta.get_field("image").to_python(self.image)
+        if not resource:
+            self.url = self.thumbnail_url = ""
+            return
+        self.url, self.thumbnail_url = get_image_backend().urls(
+            resource, self.THUMBNAIL_TRANSFORMATION
+        )
+
 
 class Review(models.Model):
     pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name="reviews")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     comments = models.TextField()
     date = models.DateField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         constraints = [
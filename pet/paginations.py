@@ -1,5 +1,54 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class DefaultPagination(PageNumberPagination):
     page_size = 8
+
+
+class OptInCursorPagination(CursorPagination):
+    """
+    Keyset pagination, switched on per request with `?pagination=cursor`
+    (or by following a `cursor` link). Pages are fetched with a WHERE on the
+    ordering key instead of an OFFSET and no COUNT query is issued, so deep
+    pages cost the same as the first one.
+    Without the opt-in the request is handled by `fallback_class`, or left
+    unpaginated when there is none.
+    """
+
+    page_size = 8
+    ordering = "id"
+    mode_query_param = "pagination"
+    fallback_class = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.fallback = None
+        if not self.is_requested(request):
+            if self.fallback_class is None:
+                return None
+            self.fallback = self.fallback_class()
+            return self.fallback.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def is_requested(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.cursor_query_param in request.query_params
+        )
+
+
+class PetCursorPagination(OptInCursorPagination):
+    """Keyset on `id`; page-number pagination stays the default."""
+
+    fallback_class = DefaultPagination
+
+
+class CreatedAtCursorPagination(OptInCursorPagination):
+    """Keyset on `(-created_at, id)` for order and transaction histories."""
+
+    page_size = 20
+    ordering = ("-created_at", "id")
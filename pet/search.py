@@ -0,0 +1,38 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.filters import SearchFilter
+from pet.models import SEARCH_CONFIG
+
+
+class PetSearchFilter(SearchFilter):
+    """
+    `?search=` over pet name, category name and description.
+    On Postgres it matches the GIN-indexed search_vector, adds trigram
+    matches on name so typos still find the pet, and orders by relevance
+    unless `?ordering=` says otherwise. Other databases (the test suite's
+    SQLite) fall back to DRF's icontains search over the same fields.
+    """
+
+    search_fields = ["name", "category__name", "description"]
+
+    def get_search_fields(self, view, request):
+        return self.search_fields
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        if connections[queryset.db].vendor != "postgresql":
+            return super().filter_queryset(request, queryset, view)
+
+        text = " ".join(terms)
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+        return (
+            queryset.filter(Q(search_vector=query) | Q(name__trigram_similar=text))
+            .annotate(
+                search_rank=SearchRank(F("search_vector"), query)
+                + TrigramSimilarity("name", text)
+            )
+            .order_by("-search_rank", "id")
+        )
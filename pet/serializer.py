@@ -1,7 +1,11 @@
+from collections import defaultdict
 from rest_framework.serializers import ModelSerializer
 from pet.models import Pet, PetImage, Review, Category
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from pet.cache import bump_catalog_version_on_commit
 
 
 class CategorySerializer(ModelSerializer):
@@ -11,14 +15,44 @@ class CategorySerializer(ModelSerializer):
         read_only_fields = ["id"]
 
 
+class StoredImageField(serializers.ImageField):
+    """Accepts uploads like ImageField but renders the URL stored on PetImage."""
+
+    def get_attribute(self, instance):
+        return instance.url
+
+    def to_representation(self, value):
+        return value or None
+
+
 class PetImageSerializer(serializers.ModelSerializer):
-    image = serializers.ImageField()
+    image = StoredImageField()
+    thumbnail = serializers.CharField(source="thumbnail_url", read_only=True)
     class Meta:
         model = PetImage
-        fields = [ "image"]
+        fields = [ "image", "thumbnail"]
+
+
+class PetImageUploadSerializer(PetImageSerializer):
+    """Image endpoint representation, including the upload state."""
+
+    class Meta(PetImageSerializer.Meta):
+        fields = ["id", "image", "thumbnail", "status", "error"]
+        read_only_fields = ["status", "error"]
+
+
+class DynamicFieldsModelSerializer(ModelSerializer):
+    """Takes an optional `fields` argument limiting which fields are rendered."""
 
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
-class PetSeralizer(ModelSerializer):
+
+class PetSeralizer(DynamicFieldsModelSerializer):
     class Meta:
         model = Pet
         fields = [
@@ -30,10 +64,12 @@ class PetSeralizer(ModelSerializer):
             "breed",
             "price",
              "availability_status",
+            "review_count",
+            "last_review_date",
             "description",
             "pet_images",
         ]
-        read_only_fields = ["availability_status"]
+        read_only_fields = ["availability_status", "review_count", "last_review_date"]
 
     category_name = serializers.CharField(source="category.name", read_only=True)
     category = serializers.PrimaryKeyRelatedField(
@@ -49,6 +85,119 @@ class PetSeralizer(ModelSerializer):
             raise serializers.ValidationError("Availability status cannot False")
 
 
+class BatchCategoryField(serializers.PrimaryKeyRelatedField):
+    """Resolves categories from one lookup shared by the whole batch."""
+
+    def to_internal_value(self, data):
+        categories = self.root.categories
+        try:
+            return categories[int(data)]
+        except (KeyError, TypeError, ValueError):
+            self.fail("does_not_exist", pk_value=data)
+
+
+def parse_pet_id(value):
+    """Returns `value` as a pet id, accepting integers and digit strings, or None."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
+
+class PetBulkListSerializer(serializers.ListSerializer):
+    """
+    Validates a batch of pets item by item and writes it with one
+    bulk_create/bulk_update. For updates `instance` maps ids to pets and
+    every item carries the id of the pet it changes.
+    """
+
+    def to_internal_value(self, data):
+        self._seen_ids = set()
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            pet_id = parse_pet_id(data.get("id") if isinstance(data, dict) else None)
+            if pet_id is None:
+                raise serializers.ValidationError({"id": ["A valid integer is required."]})
+            pet = self.instance.get(pet_id)
+            if pet is None:
+                raise serializers.ValidationError({"id": ["Pet not found."]})
+            if pet_id in self._seen_ids:
+                raise serializers.ValidationError({"id": ["Duplicate pet in this batch."]})
+            self._seen_ids.add(pet_id)
+            self.child.instance = pet
+        return super().run_child_validation(data)
+
+    @property
+    def categories(self):
+        if not hasattr(self, "_categories"):
+            self._categories = Category.objects.in_bulk()
+        return self._categories
+
+    def create(self, validated_data):
+        pets = Pet.objects.bulk_create(Pet(**attrs) for attrs in validated_data)
+        self.after_write(pets, {"name"})
+        return pets
+
+    def update(self, instance, validated_data):
+        # Items are grouped by the fields they set, one UPDATE per group, so
+        # no item writes back columns it did not send.
+        pets, groups = [], defaultdict(list)
+        now = timezone.now()
+        for item, attrs in zip(self.initial_data, validated_data):
+            pet = instance[parse_pet_id(item["id"])]
+            for name, value in attrs.items():
+                setattr(pet, name, value)
+            # bulk_update skips auto_now.
+            pet.updated_at = now
+            pets.append(pet)
+            if attrs:
+                groups[frozenset(attrs)].append(pet)
+        for fields, group in groups.items():
+            Pet.objects.bulk_update(group, [*fields, "updated_at"])
+        if groups:
+            self.after_write(pets, set().union(*groups))
+        return pets
+
+    def after_write(self, pets, fields):
+        # Bulk writes skip the Pet signals, so do their work here.
+        if fields & {"name", "description", "category"}:
+            Pet.objects.filter(pk__in=[pet.pk for pet in pets]).refresh_search_vector()
+        bump_catalog_version_on_commit()
+
+
+class PetBulkSerializer(PetSeralizer):
+    """PetSeralizer for the bulk endpoint, where admins may also set availability."""
+
+    class Meta(PetSeralizer.Meta):
+        read_only_fields = ["review_count", "last_review_date"]
+        list_serializer_class = PetBulkListSerializer
+
+    category = BatchCategoryField(queryset=Category.objects.all(), write_only=True)
+
+    def validate_availability_status(self, value):
+        return value
+
+
+class PetCompactSerializer(DynamicFieldsModelSerializer):
+    """Grid/card representation of a pet: no description, one thumbnail."""
+
+    class Meta:
+        model = Pet
+        fields = ["id", "name", "price", "category_name", "availability_status", "thumbnail"]
+        read_only_fields = fields
+
+    category_name = serializers.CharField(source="category.name", read_only=True)
+    thumbnail = serializers.SerializerMethodField()
+
+    def get_thumbnail(self, pet):
+        # Reads the prefetched images instead of querying for the first one.
+        images = pet.images.all()
+        return images[0].thumbnail_url if images else None
+
+
 
 
 
@@ -64,34 +213,28 @@ class SimpleUserSerializer(serializers.ModelSerializer):
 
 
 class ReviewSerializer(serializers.ModelSerializer):
-    user_details = serializers.SerializerMethodField(method_name="get_user_details")
+    user_details = SimpleUserSerializer(source="user", read_only=True)
 
     class Meta:
         model = Review
         fields = ["id", "user", "user_details",  "comments", "date"]
         read_only_fields = ["user", "date", ]
 
-    def get_user_details(self, obj):
-        return SimpleUserSerializer(obj.user).data
-
     def create(self, validated_data):
         pet_id = self.context["pet_id"]
         user = self.context["request"].user
-        # Check if user already has a review for this pet
-        existing_review = Review.objects.filter(pet_id=pet_id, user=user).first()
-        if existing_review:
+        # The unique_pet_user_review constraint rejects duplicates, so there is
+        # no pre-check query; the savepoint keeps the outer transaction usable.
+        try:
+            with transaction.atomic():
+                return Review.objects.create(pet_id=pet_id, user=user, **validated_data)
+        except IntegrityError:
             raise serializers.ValidationError({"detail": "You have already reviewed this pet"})
 
-        # Check if user has ordered (adopted) this pet
-        from order.models import OrderItem
-        has_ordered = OrderItem.objects.filter(pet_id=pet_id, order__user=user).exists()
-        if not has_ordered:
-            raise serializers.ValidationError({"detail": "You can only review pets you have adopted (ordered)."})
-
-        return Review.objects.create(pet_id=pet_id, user=user, **validated_data)
-
     def validate(self, attrs):
         # Ensure only users who have adopted (ordered) the pet can post a review
+        if self.instance is not None:
+            return attrs
         pet_id = self.context.get("pet_id")
         user = self.context["request"].user
         from order.models import OrderItem
@@ -0,0 +1,79 @@
+import logging
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from pet.models import PetImage
+from pet.uploads import discard_staged, stage_upload, staging_path
+from pet.validators import validate_file_size
+
+logger = logging.getLogger(__name__)
+
+
+class PetImageService:
+    @staticmethod
+    def ingest(pet_id, file):
+        """
+        Stages an uploaded file locally and records a pending PetImage.
+        The upload itself runs in a task after commit.
+        """
+        image = PetImage.objects.create(
+            pet_id=pet_id, status=PetImage.PENDING, staged_file=stage_upload(file)
+        )
+        PetImageService.schedule(image.pk)
+        return image
+
+    @staticmethod
+    def schedule(image_id):
+        # Anything the task does not get to (a lost worker, exhausted retries)
+        # stays pending for `manage.py process_pet_images`.
+        from pet.tasks import process_pet_image
+
+        process_pet_image.delay_on_commit(image_id)
+
+    @staticmethod
+    def process(image_id):
+        """
+        Validates and uploads one staged image, then marks it ready (or
+        failed when it is rejected). Upload errors leave it pending for a
+        later retry. Returns the image, or None if it was not pending.
+        """
+        image = PetImage.objects.filter(pk=image_id, status=PetImage.PENDING).first()
+        if image is None:
+            return None
+        staged_name, image.staged_file = image.staged_file, ""
+        try:
+            with open(staging_path(staged_name), "rb") as handle:
+                upload = File(handle, name=staged_name)
+                validate_file_size(upload)
+                # save() uploads the file and fills url/thumbnail_url.
+                image.image = upload
+                image.status = PetImage.READY
+                image.save()
+        except ValidationError as error:
+            PetImageService._fail(image, "; ".join(error.messages))
+        except FileNotFoundError:
+            PetImageService._fail(image, "Staged file is missing.")
+        discard_staged(staged_name)
+        return image
+
+    @staticmethod
+    def _fail(image, reason):
+        image.image = ""
+        image.status = PetImage.FAILED
+        image.error = reason[:255]
+        image.save()
+
+    @staticmethod
+    def process_pending():
+        """
+        Processes every pending image, logging upload errors so one bad
+        image does not block the rest. Returns how many were handled.
+        """
+        handled = 0
+        pending = PetImage.objects.filter(status=PetImage.PENDING).values_list("pk", flat=True)
+        for image_id in list(pending):
+            try:
+                handled += PetImageService.process(image_id) is not None
+            except Exception:
+                logger.exception("Processing pet image %s failed", image_id)
+        return handled
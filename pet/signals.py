@@ -0,0 +1,62 @@
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from pet.models import Pet, PetImage, Category, Review
+from pet.cache import bump_catalog_version_on_commit
+
+
+@receiver(post_save, sender=Pet)
+@receiver(post_delete, sender=Pet)
+@receiver(post_save, sender=PetImage)
+@receiver(post_delete, sender=PetImage)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    """
+    Any change to a pet, its images or its category changes what the catalog
+    list endpoints return, so move the catalog to a new cache version once
+    the change commits.
+    """
+    bump_catalog_version_on_commit()
+
+
+@receiver(post_save, sender=PetImage)
+@receiver(post_delete, sender=PetImage)
+def touch_pet_on_image_change(sender, instance, **kwargs):
+    """Images are part of the pet payload, so they move its Last-Modified/ETag."""
+    Pet.objects.filter(pk=instance.pet_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Category)
+def touch_pets_on_category_change(sender, instance, created, **kwargs):
+    """The category name is embedded in every pet of that category."""
+    if not created:
+        pets = Pet.objects.filter(category=instance)
+        pets.update(updated_at=timezone.now())
+        pets.refresh_search_vector()
+
+
+@receiver(post_save, sender=Pet)
+def refresh_pet_search_vector(sender, instance, **kwargs):
+    Pet.objects.filter(pk=instance.pk).refresh_search_vector()
+
+
+@receiver(post_save, sender=Review)
+def count_new_review(sender, instance, created, **kwargs):
+    """
+    Keeps the denormalized review stats on Pet current, one UPDATE per review.
+    Review.date is auto_now, so the saved review is always the latest one.
+    """
+    changes = {"last_review_date": instance.date}
+    if created:
+        changes["review_count"] = F("review_count") + 1
+    Pet.objects.filter(pk=instance.pet_id).update_catalog(**changes)
+
+
+@receiver(post_delete, sender=Review)
+def uncount_deleted_review(sender, instance, **kwargs):
+    latest = Review.objects.filter(pet=OuterRef("pk")).order_by("-date").values("date")[:1]
+    Pet.objects.filter(pk=instance.pet_id, review_count__gt=0).update_catalog(
+        review_count=F("review_count") - 1, last_review_date=Subquery(latest)
+    )
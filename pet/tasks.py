@@ -0,0 +1,8 @@
+from celery import shared_task
+from pet.services import PetImageService
+
+
+@shared_task(autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
+def process_pet_image(image_id):
+    """Uploads a staged image; upload errors are retried with backoff."""
+    PetImageService.process(image_id)
@@ -1,3 +1,675 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from PIL import Image
+from django.apps import apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from order.models import Order, OrderItem
+from pet.cache import CATALOG_CHANGED_AT_KEY, catalog_cache, get_catalog_version
+from pet.models import Category, Pet, PetImage, Review
+from pet.services import PetImageService
+from users.models import User
 
-# Create your tests here.
+
+def make_user(index):
+    return User.objects.create_user(
+        email=f"reviewer{index}@example.com", password="secret", phone_number="01234567890"
+    )
+
+
+class ReviewQueryCountTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Cat")
+        self.pet = Pet.objects.create(
+            name="Tom", age=2, description="Calm", price=Decimal("50.00"), category=category
+        )
+        self.url = f"/api/v1/pets/{self.pet.pk}/reviews/"
+        self.client = APIClient()
+
+    def adopt(self, user):
+        order = Order.objects.create(user=user, total_price=self.pet.price)
+        OrderItem.objects.create(order=order, pet=self.pet, price=self.pet.price, total_price=self.pet.price)
+
+    def test_list_query_count_is_constant(self):
+        for count in (2, 12):
+            Review.objects.all().delete()
+            for index in range(count):
+                Review.objects.create(pet=self.pet, user=make_user(f"{count}-{index}"), comments="Nice")
+            # Validator aggregate and the review/user join.
+            with self.assertNumQueries(2):
+                response = self.client.get(self.url)
+            self.assertEqual(len(response.json()), count)
+            self.assertIn("name", response.json()[0]["user_details"])
+
+    def test_create_runs_one_adoption_check(self):
+        user = make_user("author")
+        self.adopt(user)
+        self.client.force_authenticate(user)
+        # Adoption check, savepoint, insert, review stats update, release.
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, {"comments": "Lovely"}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+
+        response = self.client.post(self.url, {"comments": "Again"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Review.objects.filter(pet=self.pet, user=user).count(), 1)
+
+    def test_create_requires_adoption(self):
+        self.client.force_authenticate(make_user("stranger"))
+        response = self.client.post(self.url, {"comments": "Hi"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Review.objects.exists())
+
+
+class ReviewStatsTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Cat")
+        self.pet = Pet.objects.create(
+            name="Tom", age=2, description="Calm", price=Decimal("50.00"), category=category
+        )
+        self.url = f"/api/v1/pets/{self.pet.pk}/reviews/"
+        self.client = APIClient()
+
+    def stats(self, pet=None):
+        pet = Pet.objects.get(pk=(pet or self.pet).pk)
+        return pet.review_count, pet.last_review_date
+
+    def review(self, index, days_ago):
+        review = Review.objects.create(pet=self.pet, user=make_user(index), comments="Nice")
+        Review.objects.filter(pk=review.pk).update(date=timezone.localdate() - timedelta(days=days_ago))
+        return review
+
+    def test_create_and_delete_through_the_api_keep_stats_current(self):
+        user = make_user("author")
+        order = Order.objects.create(user=user, total_price=self.pet.price)
+        OrderItem.objects.create(order=order, pet=self.pet, price=self.pet.price, total_price=self.pet.price)
+        self.client.force_authenticate(user)
+
+        response = self.client.post(self.url, {"comments": "Lovely"}, format="json")
+        self.assertEqual(self.stats(), (1, timezone.localdate()))
+
+        self.client.delete(f"{self.url}{response.data['id']}/")
+        self.assertEqual(self.stats(), (0, None))
+
+    def test_deleting_the_latest_review_falls_back_to_the_one_before(self):
+        self.review(1, days_ago=3)
+        latest = self.review(2, days_ago=0)
+        Pet.objects.filter(pk=self.pet.pk).update(review_count=2, last_review_date=timezone.localdate())
+
+        latest.delete()
+
+        self.assertEqual(self.stats(), (1, timezone.localdate() - timedelta(days=3)))
+
+    def test_migration_backfills_stats_from_existing_reviews(self):
+        self.review(1, days_ago=5)
+        self.review(2, days_ago=2)
+        unreviewed = Pet.objects.create(
+            name="Max", age=1, description="New", price=Decimal("10.00"), category=self.pet.category
+        )
+        Pet.objects.update(review_count=7, last_review_date=timezone.localdate())
+
+        migration = import_module("pet.migrations.0016_pet_review_count_last_review_date")
+        migration.backfill_review_stats(apps, None)
+
+        self.assertEqual(self.stats(), (2, timezone.localdate() - timedelta(days=2)))
+        self.assertEqual(self.stats(unreviewed), (0, None))
+
+
+class PetSearchTests(TestCase):
+    def setUp(self):
+        # Writes in a TestCase never commit, so the catalog version stays put.
+        catalog_cache.clear()
+        dogs = Category.objects.create(name="Dog")
+        cats = Category.objects.create(name="Cat")
+        self.rex = Pet.objects.create(
+            name="Rex", age=3, description="Golden retriever, loves swimming",
+            price=Decimal("120.00"), category=dogs,
+        )
+        self.tom = Pet.objects.create(
+            name="Tom", age=2, description="Calm indoor companion",
+            price=Decimal("50.00"), category=cats,
+        )
+        self.client = APIClient()
+
+    def search(self, text):
+        response = self.client.get("/api/v1/pets/", {"search": text})
+        self.assertEqual(response.status_code, 200)
+        return [pet["id"] for pet in response.data["results"]]
+
+    def test_matches_name_category_and_description(self):
+        self.assertEqual(self.search("rex"), [self.rex.pk])
+        self.assertEqual(self.search("cat"), [self.tom.pk])
+        self.assertEqual(self.search("retriever"), [self.rex.pk])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.search("golden swimming"), [self.rex.pk])
+        self.assertEqual(self.search("golden indoor"), [])
+
+
+class AvailablePetListingTests(TestCase):
+    def setUp(self):
+        # Writes in a TestCase never commit, so the catalog version stays put.
+        catalog_cache.clear()
+        category = Category.objects.create(name="Dog")
+        self.available = Pet.objects.create(
+            name="Rex", age=3, description="Playful", price=Decimal("120.00"), category=category
+        )
+        self.adopted = Pet.objects.create(
+            name="Max", age=5, description="Adopted", price=Decimal("80.00"),
+            category=category, availability_status=False,
+        )
+        self.admin = User.objects.create_user(
+            email="admin@example.com", password="secret", phone_number="01234567890", is_staff=True
+        )
+        self.client = APIClient()
+
+    def listed(self, **params):
+        response = self.client.get("/api/v1/pets/", params)
+        self.assertEqual(response.status_code, 200)
+        return {pet["id"] for pet in response.data["results"]}
+
+    def test_lists_available_pets_by_default(self):
+        self.assertEqual(self.listed(), {self.available.pk})
+        self.assertEqual(self.listed(available="false"), {self.adopted.pk})
+
+    def test_admin_sees_every_pet(self):
+        self.assertEqual(self.listed(), {self.available.pk})
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.listed(), {self.available.pk, self.adopted.pk})
+        self.assertEqual(self.listed(available="true"), {self.available.pk})
+
+    def test_adopted_pet_detail_stays_reachable(self):
+        response = self.client.get(f"/api/v1/pets/{self.adopted.pk}/")
+        self.assertEqual(response.status_code, 200)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        # Writes in a TestCase never commit, so the catalog version stays put.
+        catalog_cache.clear()
+        category = Category.objects.create(name="Dog")
+        for index in range(3):
+            pet = Pet.objects.create(
+                name=f"Rex {index}", age=3, description="Long description " * 50,
+                price=Decimal("120.00"), category=category,
+            )
+            PetImage.objects.create(pet=pet, image=f"pets/{pet.pk}.jpg")
+        self.client = APIClient()
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/pets/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"], [query["sql"] for query in queries]
+
+    def test_fields_limit_payload_and_queries(self):
+        results, full_queries = self.get()
+        results, queries = self.get(fields="id,name,price")
+
+        self.assertEqual(set(results[0]), {"id", "name", "price"})
+        # The page's plan (a COUNT and its slice) is reused, and rows load
+        # without the images prefetch, the description or the category join.
+        self.assertEqual(len(full_queries), 4)
+        self.assertEqual(len(queries), 1)
+        pet_select = queries[-1]
+        self.assertNotIn("description", pet_select)
+        self.assertNotIn("pet_category", pet_select)
+
+    def test_compact_view(self):
+        results, queries = self.get(view="compact")
+
+        self.assertEqual(
+            set(results[0]),
+            {"id", "name", "price", "category_name", "availability_status", "thumbnail"},
+        )
+        self.assertIn("c_fill", results[0]["thumbnail"])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get("/api/v1/pets/", {"fields": "id,secret"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("fields", response.data)
+
+
+class PetCatalogCacheTests(TestCase):
+    def setUp(self):
+        # Writes in a TestCase never commit, so the catalog version stays put.
+        catalog_cache.clear()
+        category = Category.objects.create(name="Dog")
+        self.pets = [
+            Pet.objects.create(
+                name=f"Rex {index}", age=3, description="Playful",
+                price=Decimal(100 + index), category=category,
+            )
+            for index in range(10)
+        ]
+        self.client = APIClient()
+
+    def get(self, path, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries)
+
+    def test_routes_share_the_plan_and_rows(self):
+        data, queries = self.get("/api/v1/all_pets/", ordering="-price")
+        self.assertEqual([pet["id"] for pet in data], [pet.pk for pet in reversed(self.pets)])
+
+        page, page_queries = self.get("/api/v1/pets/", ordering="-price", page=2)
+        self.assertEqual(page["count"], 10)
+        self.assertEqual(page["results"], data[8:])
+        self.assertEqual(page_queries, 0)
+
+    def test_pages_only_read_their_slice_of_the_plan(self):
+        with CaptureQueriesContext(connection) as queries:
+            page = self.client.get("/api/v1/pets/", {"page": 2}).data
+
+        self.assertEqual(page["count"], 10)
+        self.assertEqual([pet["id"] for pet in page["results"]], [pet.pk for pet in self.pets[8:]])
+        count_query, plan_query = [query["sql"] for query in queries[:2]]
+        self.assertIn("COUNT(", count_query)
+        self.assertIn("LIMIT 2 OFFSET 8", plan_query)
+
+    def test_only_changed_pets_are_rendered_again(self):
+        self.get("/api/v1/all_pets/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pets[0].name = "Renamed"
+            self.pets[0].save()
+
+        data, queries = self.get("/api/v1/all_pets/")
+        self.assertEqual(data[0]["name"], "Renamed")
+        # The plan, then the one stale pet and its images.
+        self.assertEqual(queries, 3)
+
+    def test_readers_keep_the_committed_catalog_until_the_write_commits(self):
+        pet = self.pets[0]
+        self.assertIn(pet.pk, [row["id"] for row in self.get("/api/v1/all_pets/")[0]])
+        version = get_catalog_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Pet.objects.filter(pk=pet.pk).claim(), 1)
+            # A reader before the commit is served the cached, committed
+            # catalog, and nothing it caches now survives the commit.
+            self.assertEqual(get_catalog_version(), version)
+            self.assertIn(pet.pk, [row["id"] for row in self.get("/api/v1/all_pets/")[0]])
+
+        self.assertNotEqual(get_catalog_version(), version)
+        self.assertNotIn(pet.pk, [row["id"] for row in self.get("/api/v1/all_pets/")[0]])
+
+    def test_validators_change_when_a_page_shifts(self):
+        # Start from a catalog last changed an hour ago, so Last-Modified can
+        # move within the test despite its one-second resolution.
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Pet.objects.update(updated_at=an_hour_ago)
+        catalog_cache.set(CATALOG_CHANGED_AT_KEY, an_hour_ago, timeout=None)
+        first = self.client.get("/api/v1/pets/")
+        self.assertEqual(
+            self.client.get("/api/v1/pets/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304
+        )
+
+        # Pet 0 leaves the first page and pet 8 moves up; none of the pets
+        # listed on it changed.
+        with self.captureOnCommitCallbacks(execute=True):
+            Pet.objects.filter(pk=self.pets[0].pk).claim()
+            Pet.objects.create(name="Newcomer", age=1, description="New", price=1, category=self.pets[0].category)
+
+        by_etag = self.client.get("/api/v1/pets/", HTTP_IF_NONE_MATCH=first["ETag"])
+        by_date = self.client.get("/api/v1/pets/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual((by_etag.status_code, by_date.status_code), (200, 200))
+        self.assertEqual(
+            [pet["id"] for pet in by_etag.data["results"]], [pet.pk for pet in self.pets[1:9]]
+        )
+
+    @override_settings(CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "catalog": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+    })
+    def test_a_disabled_catalog_cache_reads_the_database_every_time(self):
+        first, queries = self.get("/api/v1/pets/", page=2)
+        second, repeat_queries = self.get("/api/v1/pets/", page=2)
+
+        self.assertEqual(second["results"], first["results"])
+        self.assertEqual(repeat_queries, queries)
+        self.assertGreater(repeat_queries, 0)
+
+    def test_cursor_pages_bypass_the_plan(self):
+        data, queries = self.get("/api/v1/pets/", pagination="cursor")
+        self.assertEqual([pet["id"] for pet in data["results"]], [pet.pk for pet in self.pets[:8]])
+        self.assertIsNotNone(data["next"])
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        # Writes in a TestCase never commit, so the catalog version stays put.
+        catalog_cache.clear()
+        self.category = Category.objects.create(name="Dog")
+        self.pet = Pet.objects.create(
+            name="Rex", age=3, description="Playful", price=Decimal("120.00"), category=self.category
+        )
+        self.review = Review.objects.create(pet=self.pet, user=make_user(1), comments="Nice")
+        # Last-Modified has one-second resolution, so start an hour back for
+        # a change within the test to move it.
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        for model in (Category, Pet, Review):
+            model.objects.update(updated_at=an_hour_ago)
+        catalog_cache.set(CATALOG_CHANGED_AT_KEY, an_hour_ago, timeout=None)
+        self.client = APIClient()
+
+    def assert_revalidates(self, url, change):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        validators = {"HTTP_IF_NONE_MATCH": first["ETag"], "HTTP_IF_MODIFIED_SINCE": first["Last-Modified"]}
+        for header, value in validators.items():
+            unchanged = self.client.get(url, **{header: value})
+            self.assertEqual(unchanged.status_code, 304, header)
+            self.assertEqual(unchanged["ETag"], first["ETag"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+
+        for header, value in validators.items():
+            self.assertEqual(self.client.get(url, **{header: value}).status_code, 200, header)
+
+    def rename_pet(self):
+        self.pet.name = "Renamed"
+        self.pet.save()
+
+    def rename_category(self):
+        self.category.name = "Hound"
+        self.category.save()
+
+    def edit_review(self):
+        self.review.comments = "Even nicer"
+        self.review.save()
+
+    def test_pet_list(self):
+        self.assert_revalidates("/api/v1/pets/", self.rename_pet)
+
+    def test_pet_detail(self):
+        self.assert_revalidates(f"/api/v1/pets/{self.pet.pk}/", self.rename_pet)
+
+    def test_category_list(self):
+        self.assert_revalidates("/api/v1/categories/", self.rename_category)
+
+    def test_category_detail(self):
+        self.assert_revalidates(f"/api/v1/categories/{self.category.pk}/", self.rename_category)
+
+    def test_review_list(self):
+        self.assert_revalidates(f"/api/v1/pets/{self.pet.pk}/reviews/", self.edit_review)
+
+    def test_review_detail(self):
+        self.assert_revalidates(f"/api/v1/pets/{self.pet.pk}/reviews/{self.review.pk}/", self.edit_review)
+
+    def test_etag_changes_when_a_row_is_added_without_a_newer_timestamp(self):
+        etag = self.client.get("/api/v1/categories/")["ETag"]
+        added = Category.objects.create(name="Cat")
+        Category.objects.filter(pk=added.pk).update(updated_at=self.category.updated_at)
+
+        self.assertEqual(self.client.get("/api/v1/categories/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class PetImageUrlTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Dog")
+        self.pet = Pet.objects.create(
+            name="Rex", age=3, description="Playful", price=Decimal("120.00"), category=category
+        )
+
+    def test_urls_are_stored_on_save(self):
+        image = PetImage.objects.create(pet=self.pet, image="pets/rex.jpg")
+        image.refresh_from_db()
+
+        self.assertIn("pets/rex", image.url)
+        self.assertIn("c_fill", image.thumbnail_url)
+        response = APIClient().get(f"/api/v1/pets/{self.pet.pk}/")
+        self.assertEqual(
+            response.data["pet_images"], [{"image": image.url, "thumbnail": image.thumbnail_url}]
+        )
+
+    def test_backfill_command(self):
+        image = PetImage.objects.create(pet=self.pet, image="pets/rex.jpg")
+        PetImage.objects.filter(pk=image.pk).update(url="", thumbnail_url="")
+
+        call_command("backfill_image_urls", stdout=StringIO())
+
+        image.refresh_from_db()
+        self.assertIn("pets/rex", image.url)
+        self.assertIn("c_fill", image.thumbnail_url)
+
+
+def png_upload(name="photo.png", size=(640, 480)):
+    buffer = BytesIO()
+    Image.new("RGB", size, "orange").save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class AsyncImageUploadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        overrides = override_settings(
+            PET_IMAGE_BACKEND="pet.uploads.LocalImageBackend",
+            PET_IMAGE_STAGING_DIR=f"{self.media}/staging",
+            MEDIA_ROOT=self.media,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        category = Category.objects.create(name="Dog")
+        self.pet = Pet.objects.create(
+            name="Rex", age=3, description="Playful", price=Decimal("120.00"), category=category
+        )
+        admin = User.objects.create_user(
+            email="admin@example.com", password="secret", phone_number="01234567890", is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def test_upload_is_staged_then_processed(self):
+        response = self.client.post(
+            f"/api/v1/pets/{self.pet.pk}/images/?async=true",
+            {"image": png_upload()},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], PetImage.PENDING)
+        image = PetImage.objects.get(pk=response.data["id"])
+        self.assertTrue(os.path.exists(f"{self.media}/staging/{image.staged_file}"))
+        # Pending images stay out of the catalog.
+        self.assertEqual(APIClient().get(f"/api/v1/pets/{self.pet.pk}/").data["pet_images"], [])
+
+        call_command("process_pet_images", stdout=StringIO())
+
+        image.refresh_from_db()
+        self.assertEqual(image.status, PetImage.READY)
+        self.assertEqual(image.staged_file, "")
+        self.assertTrue(image.url.startswith("/media/pet_images/"))
+        with Image.open(self.media + image.thumbnail_url.removeprefix("/media")) as thumbnail:
+            self.assertEqual(thumbnail.size, (300, 300))
+        self.assertEqual(os.listdir(f"{self.media}/staging"), [])
+
+    def test_oversized_upload_fails_validation(self):
+        os.makedirs(f"{self.media}/staging")
+        with open(f"{self.media}/staging/huge.png", "wb") as staged:
+            staged.truncate(6 * 1024 * 1024)
+        image = PetImage.objects.create(pet=self.pet, status=PetImage.PENDING, staged_file="huge.png")
+
+        PetImageService.process(image.pk)
+
+        image.refresh_from_db()
+        self.assertEqual(image.status, PetImage.FAILED)
+        self.assertIn("5MB", image.error)
+        self.assertFalse(os.path.exists(f"{self.media}/staging/huge.png"))
+
+
+class PetImportExportTests(TestCase):
+    def setUp(self):
+        self.dogs = Category.objects.create(name="Dog")
+        self.rex = Pet.objects.create(
+            name="Rex", age=3, description="Playful", price=Decimal("120.00"), category=self.dogs
+        )
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def import_file(self, name, content, *args):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as handle:
+            handle.write(content)
+        stdout, stderr = StringIO(), StringIO()
+        call_command("import_pets", path, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_jsonl_import_creates_updates_and_rejects(self):
+        rows = [
+            {"id": self.rex.pk, "name": "Rex", "category": "dog", "age": "4", "description": "Older now",
+             "breed": False, "price": "99.50", "availability_status": True},
+            {"name": "Tom", "category": "Cat", "age": "2", "description": "Calm", "price": "50"},
+            {"name": "Bad", "category": "Dog", "age": "2", "description": "x", "price": "cheap"},
+            {"id": 99999, "name": "Ghost", "category": "Dog", "age": "1", "description": "x", "price": "1"},
+        ]
+        content = "".join(json.dumps(row) + "\n" for row in rows)
+
+        stdout, stderr = self.import_file("pets.jsonl", content, "--batch-size", "2", "--create-categories")
+
+        self.assertIn("1 created, 1 updated, 2 rejected", stdout)
+        self.assertIn("rows/s", stdout)
+        self.assertIn("line 3: price", stderr)
+        self.assertIn("line 4: id", stderr)
+        self.rex.refresh_from_db()
+        self.assertEqual((self.rex.age, self.rex.price), (Decimal("4"), Decimal("99.50")))
+        tom = Pet.objects.get(name="Tom")
+        self.assertEqual(tom.category.name, "Cat")
+        self.assertTrue(tom.availability_status)
+
+    def test_partial_rows_only_update_the_columns_they_fill(self):
+        Pet.objects.filter(pk=self.rex.pk).update(breed=True, availability_status=False)
+        stdout, _ = self.import_file("prices.csv", f"id,price,age\n{self.rex.pk},80.00,\n")
+
+        self.assertIn("0 created, 1 updated, 0 rejected", stdout)
+        self.rex.refresh_from_db()
+        self.assertEqual(self.rex.price, Decimal("80.00"))
+        self.assertEqual((self.rex.name, self.rex.age, self.rex.description), ("Rex", 3, "Playful"))
+        self.assertEqual(self.rex.category, self.dogs)
+        self.assertTrue(self.rex.breed)
+        self.assertFalse(self.rex.availability_status)
+
+    def test_malformed_jsonl_lines_are_rejected(self):
+        content = '{"name": "Tom", "category": "Dog", "age": "2", "description": "Calm", "price": "50"}\n' \
+            '{"name": "Broken",\n' \
+            '["not", "an", "object"]\n' \
+            '{"name": "Jerry", "category": "Dog", "age": "1", "description": "Quick", "price": "40"}\n'
+
+        stdout, stderr = self.import_file("pets.jsonl", content)
+
+        self.assertIn("2 created, 0 updated, 2 rejected", stdout)
+        self.assertIn("line 2: Invalid JSON", stderr)
+        self.assertIn("line 3: Expected a JSON object.", stderr)
+
+    def test_csv_round_trip(self):
+        path = os.path.join(self.directory, "pets.csv")
+        call_command("export_pets", path, stderr=StringIO())
+        with open(path) as handle:
+            exported = handle.read()
+        self.assertTrue(exported.startswith("id,name,category,age,"))
+
+        Pet.objects.filter(pk=self.rex.pk).update(name="Changed")
+        stdout, stderr = self.import_file("again.csv", exported)
+
+        self.assertIn("0 created, 1 updated, 0 rejected", stdout)
+        self.rex.refresh_from_db()
+        self.assertEqual(self.rex.name, "Rex")
+
+
+class PetBulkEndpointTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Dog")
+        self.pets = [
+            Pet.objects.create(
+                name=f"Rex {index}", age=3, description="Playful",
+                price=Decimal("120.00"), category=self.category,
+            )
+            for index in range(10)
+        ]
+        self.admin = User.objects.create_user(
+            email="admin@example.com", password="secret", phone_number="01234567890", is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_bulk_update_uses_a_fixed_number_of_queries(self):
+        changes = [{"id": pet.pk, "price": "99.00", "availability_status": False} for pet in self.pets]
+
+        # Pet lookup and one UPDATE, plus the savepoint pair of the transaction.
+        with self.assertNumQueries(4):
+            response = self.client.patch("/api/v1/pets/bulk/", changes, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 10)
+        self.assertEqual(
+            set(Pet.objects.values_list("price", "availability_status")), {(Decimal("99.00"), False)}
+        )
+
+    def test_bulk_create(self):
+        pets = [
+            {"name": f"New {index}", "category": self.category.pk, "age": "1.0",
+             "description": "Fresh", "breed": False, "price": "80.00"}
+            for index in range(5)
+        ]
+
+        response = self.client.post("/api/v1/pets/bulk/", pets, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Pet.objects.filter(name__startswith="New").count(), 5)
+
+    def test_invalid_item_rejects_the_whole_batch(self):
+        changes = [
+            {"id": self.pets[0].pk, "price": "10.00"},
+            {"id": self.pets[1].pk, "price": "not a price"},
+            {"id": 99999, "price": "10.00"},
+            {"id": self.pets[2].pk, "category": 99999},
+        ]
+
+        response = self.client.patch("/api/v1/pets/bulk/", changes, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("price", response.data[1])
+        self.assertIn("id", response.data[2])
+        self.assertIn("category", response.data[3])
+        self.assertFalse(Pet.objects.filter(price=Decimal("10.00")).exists())
+
+    def test_items_only_write_the_fields_they_send(self):
+        Pet.objects.filter(pk=self.pets[1].pk).update(price=Decimal("70.00"))
+        changes = [
+            {"id": self.pets[0].pk, "price": "99.00"},
+            {"id": str(self.pets[1].pk), "name": "Renamed"},
+        ]
+
+        response = self.client.patch("/api/v1/pets/bulk/", changes, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.pets[0].refresh_from_db()
+        self.pets[1].refresh_from_db()
+        self.assertEqual((self.pets[0].name, self.pets[0].price), ("Rex 0", Decimal("99.00")))
+        self.assertEqual((self.pets[1].name, self.pets[1].price), ("Renamed", Decimal("70.00")))
+
+    def test_non_integer_ids_are_reported(self):
+        response = self.client.patch("/api/v1/pets/bulk/", [{"id": "rex", "price": "10.00"}], format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0]["id"], ["A valid integer is required."])
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(make_user(1))
+        response = self.client.patch("/api/v1/pets/bulk/", [], format="json")
+        self.assertEqual(response.status_code, 403)
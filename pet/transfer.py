@@ -0,0 +1,186 @@
+"""
+Streaming CSV/JSONL import and export of the pet catalog.
+Rows are read, validated and written in batches, so memory stays flat
+however large the file is.
+"""
+import csv
+import json
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from api.streaming import FORMATS
+from api.utils import batched
+from pet.cache import bump_catalog_version
+from pet.models import Category, Pet
+
+# Columns of an exported/imported row; categories travel by name.
+FIELDS = ["id", "name", "category", "age", "description", "breed", "price", "availability_status"]
+MODEL_FIELDS = ["name", "age", "description", "breed", "price", "availability_status"]
+BOOLEANS = {"true": True, "t": True, "yes": True, "1": True, "false": False, "f": False, "no": False, "0": False}
+# Rejected rows are counted in full but only this many are kept for reporting.
+MAX_REPORTED_ERRORS = 100
+
+
+def detect_format(path, default="csv"):
+    for fmt in FORMATS:
+        if str(path).endswith(f".{fmt}"):
+            return fmt
+    return default
+
+
+def read_rows(stream, fmt):
+    """
+    Yields (line number, row dict) from a CSV or JSONL text stream. A JSONL
+    line that is not a JSON object is yielded as a ValidationError in place
+    of the row, so the importer can reject it and carry on.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as error:
+            row = ValidationError(f"Invalid JSON: {error.msg}.")
+        if not isinstance(row, (dict, ValidationError)):
+            row = ValidationError("Expected a JSON object.")
+        yield line_number, row
+
+
+def export_rows(queryset, chunk_size=2000):
+    """Yields catalog rows straight from a server-side cursor."""
+    values = queryset.order_by("id").values("id", *MODEL_FIELDS, category_name=F("category__name"))
+    for row in values.iterator(chunk_size=chunk_size):
+        row["category"] = row.pop("category_name")
+        yield row
+
+
+class PetImporter:
+    """
+    Upserts pets in batches: rows with an id update that pet, rows without
+    one create a pet. Updates start from the stored pet and only write the
+    columns the row fills in; creates fall back to the field defaults. Each
+    batch is its own transaction. Invalid rows, including ids that do not
+    exist, are skipped and counted in `rejected`; the first
+    MAX_REPORTED_ERRORS are kept in `errors` as (line number, message).
+    """
+
+    def __init__(self, batch_size=1000, create_categories=False):
+        self.batch_size = batch_size
+        self.create_categories = create_categories
+        self.categories = {name.lower(): pk for pk, name in Category.objects.values_list("pk", "name")}
+        self.created = self.updated = self.rejected = 0
+        self.errors = []
+
+    def run(self, rows):
+        for batch in batched(rows, self.batch_size):
+            self.import_batch(batch)
+        if self.created or self.updated:
+            bump_catalog_version()
+        return self
+
+    @transaction.atomic
+    def import_batch(self, batch):
+        rows = []
+        for line_number, row in batch:
+            try:
+                if isinstance(row, ValidationError):
+                    raise row
+                rows.append((line_number, self.parse_id(row), row))
+            except ValidationError as error:
+                self.reject(line_number, "; ".join(error.messages))
+
+        ids = [pk for _, pk, _ in rows if pk is not None]
+        existing = Pet.objects.select_for_update().defer("search_vector").in_bulk(ids)
+        # Updates are grouped by the columns they write, one UPDATE per group.
+        updates, creates = defaultdict(list), []
+        for line_number, pk, row in rows:
+            if pk is not None and pk not in existing:
+                self.reject(line_number, f"id: Pet {pk} does not exist.")
+                continue
+            try:
+                pet, fields = self.build_pet(row, existing.get(pk))
+            except ValidationError as error:
+                self.reject(line_number, "; ".join(error.messages))
+                continue
+            if pet.pk is None:
+                creates.append(pet)
+            else:
+                updates[frozenset(fields)].append(pet)
+        updated = [pet for group in updates.values() for pet in group]
+        if not updated and not creates:
+            return
+        # Bulk writes skip auto_now and the Pet signals, so do their work here.
+        now = timezone.now()
+        for pet in updated + creates:
+            pet.updated_at = now
+        for fields, group in updates.items():
+            Pet.objects.bulk_update(group, [*fields, "updated_at"])
+        if creates:
+            Pet.objects.bulk_create(creates)
+        Pet.objects.filter(pk__in=[pet.pk for pet in updated + creates if pet.pk]).refresh_search_vector()
+        self.updated += len(updated)
+        self.created += len(creates)
+
+    def reject(self, line_number, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+    @staticmethod
+    def parse_id(row):
+        pk = row.get("id")
+        if pk in ("", None):
+            return None
+        if not str(pk).isdigit():
+            raise ValidationError("id: A valid integer is required.")
+        return int(pk)
+
+    def build_pet(self, row, pet=None):
+        """
+        Returns `pet` (a new Pet when None) with the row applied, and the
+        names of the fields the row set. Nothing is applied if any value is
+        invalid.
+        """
+        creating = pet is None
+        values = {}
+        for name in MODEL_FIELDS:
+            field = Pet._meta.get_field(name)
+            raw = row.get(name)
+            if raw in ("", None):
+                if not creating:
+                    continue
+                if field.has_default():
+                    values[name] = field.get_default()
+                    continue
+            if isinstance(raw, str) and raw.strip().lower() in BOOLEANS and field.get_internal_type() == "BooleanField":
+                raw = BOOLEANS[raw.strip().lower()]
+            try:
+                values[name] = field.clean(raw, None)
+            except ValidationError as error:
+                raise ValidationError(f"{name}: {'; '.join(error.messages)}")
+        if creating or str(row.get("category") or "").strip():
+            values["category"] = self.resolve_category(row.get("category"))
+        if creating:
+            pet = Pet()
+        for name, value in values.items():
+            setattr(pet, "category_id" if name == "category" else name, value)
+        return pet, list(values)
+
+    def resolve_category(self, name):
+        name = str(name or "").strip()
+        if not name:
+            raise ValidationError("category: This field cannot be blank.")
+        pk = self.categories.get(name.lower())
+        if pk is None:
+            if not self.create_categories:
+                raise ValidationError(f"category: Unknown category '{name}'.")
+            pk = self.categories[name.lower()] = Category.objects.create(name=name).pk
+        return pk
@@ -0,0 +1,78 @@
+import shutil
+from pathlib import Path
+from uuid import uuid4
+
+from cloudinary import uploader
+from django.conf import settings
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+
+class CloudinaryImageBackend:
+    """Stores pet images on Cloudinary, which serves every variant by URL."""
+
+    def upload(self, file):
+        if hasattr(file, "seekable") and file.seekable():
+            file.seek(0)
+        return uploader.upload_resource(file)
+
+    def urls(self, resource, thumbnail):
+        return resource.url, resource.build_url(**thumbnail)
+
+
+class LocalImageBackend:
+    """
+    Offline stand-in for Cloudinary: keeps originals and pre-rendered
+    thumbnails under MEDIA_ROOT so uploads work without network access.
+    """
+
+    folder = "pet_images"
+
+    def upload(self, file):
+        suffix = Path(getattr(file, "name", "") or "").suffix.lower() or ".jpg"
+        name = f"{self.folder}/{uuid4().hex}{suffix}"
+        original = Path(settings.MEDIA_ROOT) / name
+        original.parent.mkdir(parents=True, exist_ok=True)
+        file.seek(0)
+        with open(original, "wb") as destination:
+            shutil.copyfileobj(file, destination)
+        return name
+
+    def urls(self, resource, thumbnail):
+        name = f"{resource.public_id}.{resource.format}" if resource.format else resource.public_id
+        thumbnail_name = self.render_thumbnail(name, thumbnail["width"], thumbnail["height"])
+        return f"{settings.MEDIA_URL}{name}", f"{settings.MEDIA_URL}{thumbnail_name}"
+
+    def render_thumbnail(self, name, width, height):
+        """Writes a cropped thumbnail next to the original, once per size."""
+        path = Path(name)
+        thumbnail_name = str(path.with_name(f"{path.stem}_{width}x{height}{path.suffix}"))
+        original = Path(settings.MEDIA_ROOT) / name
+        target = Path(settings.MEDIA_ROOT) / thumbnail_name
+        if original.exists() and not target.exists():
+            with Image.open(original) as image:
+                ImageOps.fit(image, (width, height)).save(target)
+        return thumbnail_name
+
+
+def get_image_backend():
+    return import_string(settings.PET_IMAGE_BACKEND)()
+
+
+def staging_path(name):
+    return Path(settings.PET_IMAGE_STAGING_DIR) / name
+
+
+def stage_upload(file):
+    """Saves an uploaded file to local staging and returns its staged name."""
+    name = f"{uuid4().hex}{Path(file.name).suffix.lower()}"
+    path = staging_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as destination:
+        for chunk in file.chunks():
+            destination.write(chunk)
+    return name
+
+
+def discard_staged(name):
+    staging_path(name).unlink(missing_ok=True)
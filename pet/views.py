@@ -1,16 +1,29 @@
+import hashlib
+
 from rest_framework.viewsets import ModelViewSet
 from pet.serializer import (
-    PetImageSerializer,
+    PetImageUploadSerializer,
     CategorySerializer,
     ReviewSerializer,
     PetSeralizer,
+    PetCompactSerializer,
+    PetBulkSerializer,
+    parse_pet_id,
 )
 from pet.models import Pet, PetImage, Review, Category
+from pet.services import PetImageService
 from rest_framework import permissions
-from django_filters.rest_framework import DjangoFilterBackend, FilterSet, NumberFilter
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django.db import transaction
+from django_filters.rest_framework import BooleanFilter, DjangoFilterBackend, FilterSet, NumberFilter
 from rest_framework.filters import SearchFilter,OrderingFilter
 from rest_framework.pagination import PageNumberPagination
-from pet.paginations import DefaultPagination
+from pet.paginations import OptInCursorPagination, PetCursorPagination
+from pet.mixins import ConditionalGetMixin, SparseFieldsetMixin
+from pet.cache import get_catalog_changed_at
+from pet.catalog import PetCatalog, pet_catalog_queryset
+from pet.search import PetSearchFilter
 
 
 
@@ -23,63 +36,153 @@ class PetPriceRangeFilterSet(FilterSet):
         fields = ["category", "min_price", "max_price"]
 
 
-class PetAdoptionViewSet(ModelViewSet):
+class AvailablePetFilterSet(PetPriceRangeFilterSet):
+    available = BooleanFilter(field_name="availability_status")
+
+    class Meta(PetPriceRangeFilterSet.Meta):
+        fields = PetPriceRangeFilterSet.Meta.fields + ["available"]
+
+
+class AvailableByDefaultFilterBackend(DjangoFilterBackend):
     """
-    API endpoint that allows pets to be viewed or edited.
-    - list: Retrieve a list of all pets. Supports filtering by category.
-    - retrieve: Retrieve details of a specific pet by ID.
-    - create: Add a new pet to the adoption list. (Admin only)
-    - update: Update an existing pet's information. (Admin only)
-    - partial_update: Partially update a pet's information. (Admin only)
-    - destroy: Remove a pet from the adoption list. (Admin only)
+    Lists only available pets unless the caller is staff or passes
+    `?available=` explicitly. Detail lookups are left alone so adopted pets
+    stay reachable by id.
     """
 
-    serializer_class = PetSeralizer
-    permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_class = PetPriceRangeFilterSet
-    search_fields = ["^name"]
-    ordering_fields = ["price"]
-    pagination_class = DefaultPagination    
-    # Price range filtering is now handled by filterset_class
-    def get_queryset(self):
-        return Pet.objects.select_related('category').prefetch_related('images').all()
-    
-    
-    
-    def get_permissions(self):
-        if self.action in ["create", "update", "partial_update", "destroy"]:
-            self.permission_classes = [permissions.IsAdminUser]
-        else:
-            self.permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-        return super().get_permissions()
+    def get_filterset_kwargs(self, request, queryset, view):
+        kwargs = super().get_filterset_kwargs(request, queryset, view)
+        if (
+            view.action == "list"
+            and not request.user.is_staff
+            and "available" not in kwargs["data"]
+        ):
+            kwargs["data"] = kwargs["data"].copy()
+            kwargs["data"]["available"] = "true"
+        return kwargs
+
+
+class PetCatalogViewSet(SparseFieldsetMixin, ConditionalGetMixin, ModelViewSet):
+    """
+    Queryset, filters, permissions and cached list path shared by the catalog
+    routes, which differ only in pagination. Lists are cut from a cached plan
+    (see pet.catalog), so every route and page reuses the same filtered
+    result and rendered rows; keyset (cursor) pages are read from the
+    database directly.
+    """
 
-class AllpetViewset(ModelViewSet):
     serializer_class = PetSeralizer
+    compact_serializer_class = PetCompactSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_class = PetPriceRangeFilterSet
-    search_fields = ["^name"]
-    ordering_fields = ["price"]  
-    # Price range filtering is now handled by filterset_class
+    filter_backends = [AvailableByDefaultFilterBackend, PetSearchFilter, OrderingFilter]
+    filterset_class = AvailablePetFilterSet
+    ordering_fields = ["price", "review_count", "last_review_date"]
+    admin_actions = ["create", "update", "partial_update", "destroy"]
+
     def get_queryset(self):
-        return Pet.objects.select_related('category').prefetch_related('images').all()
-    
-    
-    
+        return pet_catalog_queryset(self.get_rendered_fields())
+
+    def list(self, request, *args, **kwargs):
+        if isinstance(self.paginator, OptInCursorPagination) and self.paginator.is_requested(request):
+            return super().list(request, *args, **kwargs)
+        catalog = PetCatalog(self)
+        plan = catalog.plan()
+        page = self.paginate_queryset(plan)
+        entries = plan.all() if page is None else page
+        # A page can change without any of its pets changing (one leaves the
+        # filter, the rest shift up), so the ETag covers exactly the pets
+        # listed and Last-Modified is when the catalog as a whole changed.
+        etag, last_modified = self.get_validators(
+            request.get_full_path(),
+            plan.count(),
+            max([get_catalog_changed_at(), *(updated_at for _, updated_at in entries)]),
+            fingerprint=hashlib.md5(
+                repr([(pk, updated_at.isoformat()) for pk, updated_at in entries]).encode()
+            ).hexdigest(),
+        )
+        return self.conditional_response(
+            request, etag, last_modified, self.render_plan, catalog, entries, page is not None
+        )
+
+    def render_plan(self, catalog, entries, paginated):
+        rows = catalog.rows(entries)
+        return self.get_paginated_response(rows) if paginated else Response(rows)
+
     def get_permissions(self):
-        if self.action in ["create", "update", "partial_update", "destroy"]:
+        if self.action in self.admin_actions:
             self.permission_classes = [permissions.IsAdminUser]
         else:
             self.permission_classes = [permissions.IsAuthenticatedOrReadOnly]
         return super().get_permissions()
 
+
+class PetAdoptionViewSet(PetCatalogViewSet):
+    """
+    API endpoint that allows pets to be viewed or edited.
+    - list: Retrieve a list of pets. Supports filtering by category and
+      `?search=` over name, category and description. Only available pets
+      are listed unless `?available=false` is passed or the user is an admin.
+      Pass `?pagination=cursor` for keyset pagination on deep pages,
+      `?fields=id,name,...` for a sparse payload or `?view=compact` for the
+      grid representation (id, name, price, category, thumbnail).
+    - bulk: POST a list of pets to create them, or PATCH a list of partial
+      pets (each with its `id`) to update them, in one transaction. Any
+      invalid item fails the batch and the response lists errors per item.
+      (Admin only)
+    - retrieve: Retrieve details of a specific pet by ID.
+    - create: Add a new pet to the adoption list. (Admin only)
+    - update: Update an existing pet's information. (Admin only)
+    - partial_update: Partially update a pet's information. (Admin only)
+    - destroy: Remove a pet from the adoption list. (Admin only)
+    """
+
+    pagination_class = PetCursorPagination
+    admin_actions = PetCatalogViewSet.admin_actions + ["bulk"]
+    bulk_max_items = 1000
+
+    @action(detail=False, methods=["post", "patch"])
+    def bulk(self, request):
+        partial = request.method == "PATCH"
+        with transaction.atomic():
+            instance = None
+            if partial and isinstance(request.data, list):
+                # Locked until the batch is written, so a concurrent edit
+                # cannot land between the read and the bulk UPDATE.
+                ids = [parse_pet_id(item.get("id")) for item in request.data if isinstance(item, dict)]
+                instance = Pet.objects.select_for_update().in_bulk([pk for pk in ids if pk is not None])
+            serializer = PetBulkSerializer(
+                instance,
+                data=request.data,
+                many=True,
+                partial=partial,
+                max_length=self.bulk_max_items,
+                context=self.get_serializer_context(),
+            )
+            serializer.is_valid(raise_exception=True)
+            pets = serializer.save()
+        return Response(
+            {"count": len(pets), "ids": [pet.pk for pet in pets]},
+            status=200 if partial else 201,
+        )
+
+
+class AllpetViewset(PetCatalogViewSet):
+    """
+    The pets catalog in one unpaginated response, with the same filters as
+    `pets` and served from the same cached plan and rows.
+    """
+
+    pagination_class = None
+
+
 class PetImageViewSet(ModelViewSet):
     """
     API endpoint that allows pet images to be viewed or edited.
     - list: Retrieve a list of all images for a specific pet.
     - retrieve: Retrieve a specific image by ID.
     - create: Add a new image for a pet. (Admin only)
+      With `?async=true` the file is staged and 202 is returned with a
+      pending image, which a background worker uploads and marks ready.
     - update: Update an existing image. (Admin only)
     - destroy: Remove an image. (Admin only)
     """
@@ -90,7 +193,7 @@ class PetImageViewSet(ModelViewSet):
             return PetImage.objects.none()
         return PetImage.objects.select_related('pet').filter(pet_id=pets_pk)
 
-    serializer_class = PetImageSerializer
+    serializer_class = PetImageUploadSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = PageNumberPagination
 
@@ -98,7 +201,20 @@ class PetImageViewSet(ModelViewSet):
         pets_pk = self.kwargs.get("pets_pk")
         if not pets_pk:
             return PetImage.objects.none()
-        return PetImage.objects.filter(pet_id=pets_pk)
+        images = PetImage.objects.filter(pet_id=pets_pk)
+        if not self.request.user.is_staff:
+            images = images.filter(status=PetImage.READY)
+        return images
+
+    def create(self, request, *args, **kwargs):
+        if request.query_params.get("async") != "true":
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        image = PetImageService.ingest(
+            self.kwargs.get("pets_pk"), serializer.validated_data["image"]
+        )
+        return Response(self.get_serializer(image).data, status=202)
 
     def perform_create(self, serializer):
         pets_pk = self.kwargs.get("pets_pk")
@@ -113,7 +229,7 @@ class PetImageViewSet(ModelViewSet):
         return super().get_permissions()
 
 
-class PetCategoryViewSet(ModelViewSet):
+class PetCategoryViewSet(ConditionalGetMixin, ModelViewSet):
     """
     API endpoint that allows pet categories to be viewed or edited.
     - list: Retrieve a list of all pet categories.
@@ -141,7 +257,7 @@ class PetCategoryViewSet(ModelViewSet):
         return super().get_permissions()
 
 
-class ReviewViewSet(ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, ModelViewSet):
     """
     API endpoint that allows pet reviews to be viewed or edited.
     - list: Retrieve a list of all reviews for a specific pet.
@@ -1,20 +1,52 @@
-# from djoser import email
-
-# # {
-# #     'activation': 'djoser.email.ActivationEmail',
-# #     'confirmation': 'djoser.email.ConfirmationEmail',
-# #     'password_reset': 'djoser.email.PasswordResetEmail',
-# #     'password_changed_confirmation': 'djoser.email.PasswordChangedConfirmationEmail',
-# # }
-
-# class ActivationEmail(email.ActivationEmail):
-#     template_name =  'users/activation.html'
-    
-# class ConfirmationEmail(email.ConfirmationEmail):
-#     template_name = 'users/confirmation.html'
-    
-# class PasswordResetEmail(email.PasswordResetEmail):
-#     template_name = 'users/password_reset.html'
-
-# class PasswordChangedConfirmationEmail(email.PasswordChangedConfirmationEmail):
-#     template_name = 'users/password_change_confirmation.html'
\ No newline at end of file
+from django.conf import settings
+from djoser import email
+from users.tasks import send_email
+
+
+class DeferredEmailMixin:
+    """
+    Renders a djoser email inside the request, where the user, token and
+    site are at hand, and leaves the SMTP round trip to the send_email task
+    once the surrounding transaction commits.
+    """
+
+    def send(self, to, fail_silently=False, **kwargs):
+        self.render()
+        send_email.delay_on_commit(
+            {
+                "subject": self.subject,
+                "body": self.body,
+                "content_subtype": self.content_subtype,
+                "alternatives": [[content, mimetype] for content, mimetype in self.alternatives],
+                "from_email": kwargs.pop("from_email", settings.DEFAULT_FROM_EMAIL),
+                "to": list(to),
+                "cc": kwargs.pop("cc", []),
+                "bcc": kwargs.pop("bcc", []),
+                "reply_to": kwargs.pop("reply_to", []),
+                "fail_silently": fail_silently,
+            }
+        )
+
+
+class ActivationEmail(DeferredEmailMixin, email.ActivationEmail):
+    pass
+
+
+class ConfirmationEmail(DeferredEmailMixin, email.ConfirmationEmail):
+    pass
+
+
+class PasswordResetEmail(DeferredEmailMixin, email.PasswordResetEmail):
+    pass
+
+
+class PasswordChangedConfirmationEmail(DeferredEmailMixin, email.PasswordChangedConfirmationEmail):
+    pass
+
+
+class UsernameChangedConfirmationEmail(DeferredEmailMixin, email.UsernameChangedConfirmationEmail):
+    pass
+
+
+class UsernameResetEmail(DeferredEmailMixin, email.UsernameResetEmail):
+    pass
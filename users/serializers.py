@@ -4,6 +4,7 @@ from users.models import User, AccountBalance
 from rest_framework import serializers
 from decimal import Decimal
 from order.serializers import OrderItemSerializer
+from payment.services import LedgerService
 from rest_framework import status
 import time
 
@@ -47,12 +48,8 @@ class AddBalanceSerializer(ModelSerializer):
         user = self.context["request"].user
         if not hasattr(user, 'pin') or str(user.pin) != str(pin):
             raise serializers.ValidationError({"pin": "Invalid PIN."})
-        account_balance, _ = AccountBalance.objects.get_or_create(user=user)
-        account_balance.balance += amount
-        account_balance.add_money += amount
-        account_balance.save()
         # Return the account_balance instance for the view to handle the response
-        return account_balance
+        return LedgerService.deposit(user, amount)
 
     def update(self, instance, validated_data):
         # Handle the update logic here
@@ -0,0 +1,23 @@
+from celery import shared_task
+from django.core.mail import EmailMultiAlternatives
+
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, max_retries=5)
+def send_email(message):
+    """
+    Sends a message rendered by users.email. SMTP and connection errors are
+    OSErrors, so a mail server that is briefly down is retried with backoff.
+    """
+    email = EmailMultiAlternatives(
+        subject=message["subject"],
+        body=message["body"],
+        from_email=message["from_email"],
+        to=message["to"],
+        cc=message["cc"],
+        bcc=message["bcc"],
+        reply_to=message["reply_to"],
+    )
+    email.content_subtype = message["content_subtype"]
+    for content, mimetype in message["alternatives"]:
+        email.attach_alternative(content, mimetype)
+    email.send(fail_silently=message["fail_silently"])
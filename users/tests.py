@@ -1,3 +1,209 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core import mail
+from django.db import close_old_connections, connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from kombu.exceptions import OperationalError as BrokerError
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from api.testing import retry_on_lock
+from payment.models import TransactionHistory
+from payment.services import LedgerService
+from users.models import AccountBalance, User
+from users.tasks import send_email
 
-# Create your tests here.
+
+def make_user(email="holder@example.com"):
+    return User.objects.create_user(email=email, password="secret", phone_number="01234567890")
+
+
+class LedgerServiceTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def test_deposit_records_history_with_resulting_balance(self):
+        LedgerService.deposit(self.user, Decimal("150.00"))
+        account = LedgerService.deposit(self.user, Decimal("100.00"))
+
+        self.assertEqual(account.balance, Decimal("250.00"))
+        self.assertEqual(account.add_money, Decimal("250.00"))
+        entries = TransactionHistory.objects.filter(user=self.user).order_by("id")
+        self.assertEqual(
+            [(e.transaction_type, e.balance_after) for e in entries],
+            [("deposit", Decimal("150.00")), ("deposit", Decimal("250.00"))],
+        )
+
+    def test_charge_refuses_overdraft(self):
+        LedgerService.deposit(self.user, Decimal("100.00"))
+        with self.assertRaises(ValidationError):
+            LedgerService.charge(self.user, Decimal("100.01"))
+        self.assertEqual(AccountBalance.objects.get(user=self.user).balance, Decimal("100.00"))
+        self.assertFalse(
+            TransactionHistory.objects.filter(transaction_type=TransactionHistory.PAYMENT).exists()
+        )
+
+
+class LedgerConcurrencyTests(TransactionTestCase):
+    WORKERS = 8
+    DEPOSITS_PER_WORKER = 10
+
+    def test_parallel_deposits_and_charges_lose_no_updates(self):
+        user = make_user()
+        LedgerService.deposit(user, Decimal("1000.00"))
+        errors = []
+        start = threading.Barrier(self.WORKERS)
+
+        def worker(index):
+            try:
+                start.wait()
+                for _ in range(self.DEPOSITS_PER_WORKER):
+                    if index % 2:
+                        retry_on_lock(LedgerService.charge, user, Decimal("1.00"))
+                    else:
+                        retry_on_lock(LedgerService.deposit, user, Decimal("3.00"))
+            except Exception as exc:  # surfaced through the assertion below
+                errors.append(exc)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        moves = self.WORKERS // 2 * self.DEPOSITS_PER_WORKER
+        account = AccountBalance.objects.get(user=user)
+        self.assertEqual(account.balance, Decimal("1000.00") + moves * Decimal("2.00"))
+        self.assertEqual(TransactionHistory.objects.filter(user=user).count(), 1 + 2 * moves)
+        # Replaying the history in order reproduces every recorded balance.
+        balance = Decimal("0.00")
+        for entry in TransactionHistory.objects.filter(user=user).order_by("created_at", "id"):
+            if entry.transaction_type == TransactionHistory.PAYMENT:
+                balance -= entry.amount
+            else:
+                balance += entry.amount
+            self.assertEqual(entry.balance_after, balance)
+
+
+class TransactionExportTests(TestCase):
+    url = "/api/v1/payment_history/export/"
+
+    def setUp(self):
+        self.user = make_user()
+        with self.captureOnCommitCallbacks(execute=True):
+            for amount in ("10.00", "20.00", "30.00"):
+                LedgerService.deposit(self.user, Decimal(amount))
+            LedgerService.deposit(make_user("other@example.com"), Decimal("99.00"))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_jsonl_streams_only_own_history_newest_first(self):
+        lines = [json.loads(line) for line in self.export().splitlines()]
+
+        self.assertEqual([line["amount"] for line in lines], ["30.00", "20.00", "10.00"])
+        self.assertEqual(lines[0]["balance_after"], "60.00")
+        self.assertEqual(set(lines[0]), {"id", "transaction_type", "amount", "balance_after", "order", "created_at"})
+
+    def test_csv_with_date_range(self):
+        today = timezone.localdate()
+        TransactionHistory.objects.filter(amount=Decimal("10.00")).update(
+            created_at=timezone.now() - timedelta(days=3)
+        )
+
+        rows = list(csv.DictReader(io.StringIO(self.export(export_format="csv", start=today, end=today))))
+
+        self.assertEqual([row["amount"] for row in rows], ["30.00", "20.00"])
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url, {"export_format": "xml", "start": "2020-02-02", "end": "2020-01-01"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("export_format", response.data)
+
+
+class TransactionHistoryListTests(TestCase):
+    url = "/api/v1/payment_history/"
+
+    def setUp(self):
+        self.user = make_user()
+        for _ in range(25):
+            LedgerService.deposit(self.user, Decimal("1.00"))
+        LedgerService.deposit(make_user("other@example.com"), Decimal("1.00"))
+        # Entries written within one clock tick would tie on created_at.
+        start = timezone.now() - timedelta(hours=1)
+        for index, pk in enumerate(TransactionHistory.objects.order_by("id").values_list("pk", flat=True)):
+            TransactionHistory.objects.filter(pk=pk).update(created_at=start + timedelta(minutes=index))
+        # Newest first: the entry with the largest balance comes first.
+        self.balances = [f"{Decimal(25 - i):.2f}" for i in range(25)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_is_unpaginated_by_default(self):
+        data = self.client.get(self.url).data
+
+        self.assertEqual(data["count"], 25)
+        self.assertEqual([entry["balance_after"] for entry in data["results"]], self.balances)
+
+    def test_cursor_pages_run_newest_first(self):
+        first = self.client.get(self.url, {"pagination": "cursor"}).data
+        second = self.client.get(first["next"]).data
+
+        self.assertEqual([entry["balance_after"] for entry in first["results"]], self.balances[:20])
+        self.assertEqual([entry["balance_after"] for entry in second["results"]], self.balances[20:])
+        self.assertIsNone(second["next"])
+
+
+class DeferredEmailTests(TestCase):
+    def test_activation_email_is_sent_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post(
+                "/api/v1/auth/users/",
+                {
+                    "email": "new@example.com",
+                    "password": "Sup3r-secret-pass",
+                    "re_password": "Sup3r-secret-pass",
+                    "first_name": "New",
+                    "last_name": "User",
+                    "phone_number": "01234567890",
+                },
+            )
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(mail.outbox, [])
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["new@example.com"])
+        self.assertIn("/activation/", mail.outbox[0].body)
+
+    def test_broker_failure_after_commit_does_not_fail_the_request(self):
+        with mock.patch.object(send_email, "delay", side_effect=BrokerError("broker down")):
+            with self.assertLogs("peady.celery", "ERROR") as logs:
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = APIClient().post(
+                        "/api/v1/auth/users/",
+                        {
+                            "email": "new@example.com",
+                            "password": "Sup3r-secret-pass",
+                            "re_password": "Sup3r-secret-pass",
+                            "first_name": "New",
+                            "last_name": "User",
+                            "phone_number": "01234567890",
+                        },
+                    )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.filter(email="new@example.com").exists())
+        self.assertIn("users.tasks.send_email", logs.output[0])
@@ -11,6 +11,7 @@ from rest_framework.decorators import action
 from payment.models import TransactionHistory
 from payment.serializers import TransactionHistorySerializer
 from rest_framework.viewsets import ReadOnlyModelViewSet
+from api.idempotency import idempotent
 
 
 class UserProfileViewSet(ModelViewSet):
@@ -43,6 +44,9 @@ class AccountBalanceViewSet(ModelViewSet):
    
     """
     API endpoint that allows users to add money to their account balance.                   
+    - create: Deposit money. Send an `Idempotency-Key` header to make retries
+      safe: a retry with the same key returns the first response instead of
+      depositing again.
     - partial_update: Partially update the user's account balance. (Authenticated users only)       
     - retrieve: Retrieve details of the user's account balance. (Authenticated users only)  
     """
@@ -57,6 +61,7 @@ class AccountBalanceViewSet(ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
     
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)